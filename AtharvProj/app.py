@@ -1,81 +1,153 @@
 import os
-import base64
-import requests
 import json
-import re
+import math
+import time
+import uuid
+from concurrent.futures import TimeoutError as FutureTimeoutError, as_completed
 from dotenv import load_dotenv
-from flask import Flask, request, jsonify, render_template
+from flask import Blueprint, Flask, Response, request, jsonify, render_template, url_for
 from werkzeug.utils import secure_filename
 from flask_cors import CORS
 
+from cache import ResponseCache
+from gemini_client import GeminiClient
+from imaging import build_request_body, normalize_image, sniff_mime
+from jobs import JobQueue
+from ratelimit import FairExecutor, RateLimiter
+from report import STRUCTURED_GENERATION_CONFIG, ReportError, parse_report, parse_structured_report
+
 load_dotenv()
 GEMINI_API_KEY = os.getenv("GEMINI_API_KEY")
 if not GEMINI_API_KEY:
     raise EnvironmentError("Please set GEMINI_API_KEY in your .env file.")
 
-GEMINI_API_URL = "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
-
-app = Flask(__name__)
-app.config['UPLOAD_FOLDER'] = '/tmp'
-app.config['MAX_CONTENT_LENGTH'] = 15 * 1024 * 1024
-
-def clean_json(text_output):
-    # Remove markdown code fences like ```json  ``` or ```JSON  ```
-    cleaned = re.sub(r"```(?:json|JSON)?", "", text_output).strip()
-    cleaned = cleaned.replace("```", "").strip()
-
-    # Extract JSON object only
-    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
-    if not match:
-        raise ValueError("No valid JSON object found.")
-    
-    json_str = match.group()
-
-    # Return the JSON string for later parsing
-    return json_str
-
-def identify_lab_equipment_from_bytes(image_bytes, mime_type="image/jpeg"):
-    image_base64 = base64.b64encode(image_bytes).decode("utf-8")
-
-    headers = {"Content-Type": "application/json"}
-    payload = {
-        "contents": [
-            {
-                "parts": [
-                    {"text": PROMPT},
-                    {"inline_data": {"mime_type": mime_type, "data": image_base64}}
-                ]
-            }
-        ]
-    }
+GEMINI_API_URL = os.getenv(
+    "GEMINI_API_URL",
+    "https://generativelanguage.googleapis.com/v1beta/models/gemini-2.5-flash:generateContent"
+)
 
-    r = requests.post(
-        f"{GEMINI_API_URL}?key={GEMINI_API_KEY}",
-        headers=headers,
-        json=payload,
-        timeout=60
-    )
-    print(f"req. response code {r.status_code}")
+# At most this many model calls are in flight per process, and at most GEMINI_RPS start per second (0 = no limit)
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+GEMINI_TIMEOUT = float(os.getenv("GEMINI_TIMEOUT", "60"))
+gemini_limiter = RateLimiter(
+    rate=float(os.getenv("GEMINI_RPS", "0")),
+    burst=float(os.getenv("GEMINI_BURST", "0")) or None,
+    max_concurrency=GEMINI_MAX_CONCURRENCY,
+    state_path=os.getenv("GEMINI_RATE_STATE") or None,
+    queue_timeout=float(os.getenv("GEMINI_QUEUE_TIMEOUT", "300")),
+)
+# Uploads take turns for threads here, then again for call slots in the limiter (retries and repairs included)
+gemini_executor = FairExecutor(max_workers=GEMINI_MAX_CONCURRENCY * 4, thread_name_prefix="gemini")
+
+# Uploads are downscaled to this longest edge and re-encoded before analysis (0 disables)
+IMAGE_MAX_EDGE = int(os.getenv("IMAGE_MAX_EDGE", "1536"))
+IMAGE_FORMAT = os.getenv("IMAGE_FORMAT", "JPEG").upper()
+IMAGE_QUALITY = int(os.getenv("IMAGE_QUALITY", "85"))
+
+# Pooled keep-alive client shared by all request threads
+gemini_client = GeminiClient(
+    GEMINI_API_URL,
+    GEMINI_API_KEY,
+    timeout=GEMINI_TIMEOUT,
+    pool_size=int(os.getenv("GEMINI_POOL_SIZE", str(GEMINI_MAX_CONCURRENCY))),
+    retries=int(os.getenv("GEMINI_RETRIES", "3")),
+    backoff=float(os.getenv("GEMINI_BACKOFF", "0.5")),
+    max_backoff=float(os.getenv("GEMINI_MAX_BACKOFF", "30")),
+    limiter=gemini_limiter,
+)
+
+# Cache of analysis results; the disk tier is only used when GEMINI_CACHE_DIR is set
+response_cache = ResponseCache(
+    max_entries=int(os.getenv("GEMINI_CACHE_SIZE", "256")),
+    disk_dir=os.getenv("GEMINI_CACHE_DIR") or None,
+    ttl=float(os.getenv("GEMINI_CACHE_TTL", str(7 * 24 * 3600))),
+    max_disk_bytes=int(float(os.getenv("GEMINI_CACHE_MAX_MB", "256")) * 1024 * 1024),
+)
 
+# Structured output mode: the API enforces report.RESPONSE_SCHEMA and replies with bare JSON
+GEMINI_STRUCTURED = os.getenv("GEMINI_STRUCTURED", "0").lower() in ("1", "true", "yes")
+
+# When set, raw model replies are saved here for benchmarking the report parser
+GEMINI_RECORD_DIR = os.getenv("GEMINI_RECORD_DIR")
+
+UPLOAD_FOLDER = '/tmp'
+MAX_CONTENT_LENGTH = 15 * 1024 * 1024
+# Origins allowed to call /api/* from the browser (comma-separated)
+CORS_ORIGINS = os.getenv("CORS_ORIGINS", "*")
+
+bp = Blueprint("atharv", __name__)
+
+def identify_lab_equipment_from_bytes(image_bytes, mime_type=None, client=None):
+    prompt = STRUCTURED_PROMPT if GEMINI_STRUCTURED else PROMPT
+    # Keyed on the original upload so repeats skip decoding and resizing too
+    settings = f"{IMAGE_MAX_EDGE}:{IMAGE_FORMAT}:{IMAGE_QUALITY}"
+    cache_key = response_cache.key(image_bytes, prompt, GEMINI_API_URL, settings)
+    cached = response_cache.get(cache_key)
+    if cached is not None:
+        return cached
+
+    if IMAGE_MAX_EDGE > 0:
+        image_bytes, mime_type = normalize_image(image_bytes, IMAGE_MAX_EDGE, IMAGE_FORMAT, IMAGE_QUALITY)
+    mime_type = mime_type or sniff_mime(image_bytes) or "image/jpeg"
+
+    extra = {"generationConfig": STRUCTURED_GENERATION_CONFIG} if GEMINI_STRUCTURED else None
+    r = gemini_client.generate(build_request_body(prompt, mime_type, image_bytes, extra), client=client)
+    text_output, failure = model_text(r)
+    if failure is not None:
+        return failure
+
+    if GEMINI_RECORD_DIR:
+        record_reply(cache_key, text_output)
+
+    print("converting the content into JSON.....")
+    try:
+        if GEMINI_STRUCTURED:
+            data = parse_or_repair(text_output, client)
+        else:
+            data = parse_report(text_output)
+    except ReportError as e:
+        return {"error": f"Unexpected response format from model: {e}"}
+    print(data)
+    response_cache.put(cache_key, data)
+    return data
+
+def model_text(r):
+    """Pull the reply text out of a generateContent response; returns (text, None) or (None, error result)"""
+    print(f"req. response code {r.status_code}")
     if r.status_code != 200:
-        return {"error": f"{r.status_code}: {r.text}"}
+        return None, {"error": f"{r.status_code}: {r.text}"}
 
     result = r.json()
     try:
-        text_output = result["candidates"][0]["content"]["parts"][0]["text"]
+        return result["candidates"][0]["content"]["parts"][0]["text"], None
     except Exception:
-        return {"error": "Unexpected response format from model.", "raw": result}
+        return None, {"error": "Unexpected response format from model.", "raw": result}
 
-    print("converting the content into JSON.....")
-    cleansed_json_str = clean_json(text_output)
-    print(cleansed_json_str)
+def parse_or_repair(text_output, client):
+    """Parse a structured reply; if it is invalid, ask once for a corrected one (text only, the image is not resent)"""
     try:
-        data = json.loads(cleansed_json_str)
-        print(f"data type of the json is {type(data)}")
-        print(data)
-        return data
-    except Exception:
-        return {"error": "Unexpected response format from model: JSON conversion failed." }
+        return parse_structured_report(text_output).to_dict()
+    except ReportError as e:
+        error = e
+
+    print(f"invalid structured reply ({error}), asking for a repair")
+    repair = {
+        "contents": [{"role": "user", "parts": [{"text": REPAIR_PROMPT.format(error=error, reply=text_output)}]}],
+        "generationConfig": STRUCTURED_GENERATION_CONFIG,
+    }
+    text_output, failure = model_text(gemini_client.generate(repair, client=client))
+    if failure is not None:
+        raise ReportError(f"repair failed: {failure['error']}")
+    return parse_structured_report(text_output).to_dict()
+
+def record_reply(cache_key, text_output):
+    # Raw replies make up the corpus for bench_report.py
+    try:
+        os.makedirs(GEMINI_RECORD_DIR, exist_ok=True)
+        with open(os.path.join(GEMINI_RECORD_DIR, cache_key[:16] + ".txt"), "w", encoding="utf-8") as f:
+            f.write(text_output)
+    except OSError as e:
+        print(f"could not record model reply: {e}")
 
 PROMPT = (
     "You must analyze the provided image of a room and output ONLY valid JSON in the following structure: "
@@ -90,45 +162,195 @@ PROMPT = (
     "Output strictly valid JSON—no explanations, no extra text. Keep all responses very concise."
 )
 
+# The response schema carries the structure in structured mode, so the prompt only states the tasks
+STRUCTURED_PROMPT = (
+    "Analyze the provided image of a room. "
+    "1) Identify all items in the room and describe each briefly (max 10 words). "
+    "2) Provide a sustainability score (1–10). "
+    "3) Suggest greener alternatives for each item (max 15 words per alternative). "
+    "4) Provide ways to improve temperature regulation (max 20 words per suggestion). "
+    "Keep all responses very concise."
+)
+
+REPAIR_PROMPT = (
+    "The following sustainability report does not match the required schema ({error}). "
+    "Return the corrected report as JSON only, keeping its content.\n\n{reply}"
+)
+
+# Background queue for /api/jobs; its workers share the analysis path (and cache) with /api/identify
+JOB_EVENTS_KEEPALIVE = 15
+def analyze_job_image(image_bytes, job_id):
+    return identify_lab_equipment_from_bytes(image_bytes, client=job_id)
+
+job_queue = JobQueue(
+    os.getenv("JOBS_DB", os.path.join(UPLOAD_FOLDER, "atharv_jobs.sqlite3")),
+    analyze_job_image,
+    workers=int(os.getenv("JOB_WORKERS", str(GEMINI_MAX_CONCURRENCY))),
+    retention=float(os.getenv("JOB_RETENTION_HOURS", "24")) * 3600,
+    lease=float(os.getenv("JOB_LEASE", "600")),
+)
 
-@app.route('/')
+@bp.route('/')
 def index():
     return render_template('index.html')
 
-@app.post("/api/identify")
-def identify_api():
-    if 'images' not in request.files:
-        return jsonify({"error": "No images provided. Use field name 'images'."}), 400
-
-    files = request.files.getlist('images')
-    results = []
+@bp.get("/api/stats")
+def stats_api():
+    return jsonify({
+        "cache": response_cache.stats(),
+        "jobs": job_queue.stats(),
+        "limiter": gemini_limiter.stats(),
+    })
 
+def read_uploads(files):
+    """Read every upload; yields (idx, filename, image_bytes, error) with image_bytes None on error"""
     for idx, f in enumerate(files):
         filename = secure_filename(f.filename or f"image_{idx}.jpg")
         if not filename:
-            results.append({"index": idx, "filename": None, "error": "Empty filename."})
+            yield idx, None, None, "Empty filename."
             continue
 
-        ext = filename.rsplit(".", 1)[-1].lower() if "." in filename else "jpg"
-        mime = "image/jpeg"
-        if ext in ("png",): mime = "image/png"
-        if ext in ("webp",): mime = "image/webp"
-
         try:
             image_bytes = f.read()
-            if not image_bytes:
-                results.append({"index": idx, "filename": filename, "error": "Empty file."})
-                continue
-
-            out = identify_lab_equipment_from_bytes(image_bytes, mime)
-            out.update({"index": idx, "filename": filename})
-            results.append(out)
         except Exception as e:
-            results.append({"index": idx, "filename": filename, "error": str(e)})
+            yield idx, filename, None, str(e)
+            continue
+        if not image_bytes:
+            yield idx, filename, None, "Empty file."
+            continue
+        yield idx, filename, image_bytes, None
+
+def submit_uploads(files):
+    """Read every upload and queue it for analysis; returns (results known immediately, pending calls)"""
+    ready = []
+    pending = []
+    # Each upload is its own client in the limiter, so a big batch takes turns with smaller ones
+    client = uuid.uuid4().hex
+
+    for idx, filename, image_bytes, error in read_uploads(files):
+        if error is not None:
+            ready.append({"index": idx, "filename": filename, "error": error})
+            continue
+        future = gemini_executor.submit(client, identify_lab_equipment_from_bytes, image_bytes, client=client)
+        pending.append((idx, filename, future))
+
+    return ready, pending
+
+def analysis_deadline(pending):
+    # Every call has its own HTTP timeout; the shared deadline also bounds time spent queued
+    waves = math.ceil(len(pending) / GEMINI_MAX_CONCURRENCY)
+    return time.monotonic() + GEMINI_TIMEOUT * (waves + 1)
+
+def collect_result(idx, filename, future, deadline):
+    try:
+        out = future.result(timeout=max(0, deadline - time.monotonic()))
+    except FutureTimeoutError:
+        future.cancel()
+        out = {"error": "Timed out waiting for the model."}
+    except Exception as e:
+        out = {"error": str(e)}
+    out.update({"index": idx, "filename": filename})
+    return out
+
+def wants_stream():
+    return (request.args.get("stream") == "ndjson"
+            or request.accept_mimetypes.best == "application/x-ndjson")
+
+def stream_results(ready, pending, deadline):
+    """Yield one NDJSON line per image, in the order the analyses finish"""
+    for out in ready:
+        yield json.dumps(out) + "\n"
+
+    waiting = {future: (idx, filename) for idx, filename, future in pending}
+    try:
+        for future in as_completed(waiting, timeout=max(0, deadline - time.monotonic())):
+            idx, filename = waiting.pop(future)
+            yield json.dumps(collect_result(idx, filename, future, deadline)) + "\n"
+    except FutureTimeoutError:
+        for future, (idx, filename) in waiting.items():
+            yield json.dumps(collect_result(idx, filename, future, deadline)) + "\n"
+
+@bp.post("/api/identify")
+def identify_api():
+    if 'images' not in request.files:
+        return jsonify({"error": "No images provided. Use field name 'images'."}), 400
+
+    files = request.files.getlist('images')
+    ready, pending = submit_uploads(files)
+    deadline = analysis_deadline(pending)
+
+    # ?stream=ndjson (or Accept: application/x-ndjson) sends each result as soon as it is ready
+    if wants_stream():
+        return Response(stream_results(ready, pending, deadline), mimetype="application/x-ndjson")
+
+    results = [None] * len(files)
+    for out in ready:
+        results[out["index"]] = out
+    for idx, filename, future in pending:
+        results[idx] = collect_result(idx, filename, future, deadline)
 
     return jsonify({"results": results})
 
+@bp.post("/api/jobs")
+def create_job():
+    if 'images' not in request.files:
+        return jsonify({"error": "No images provided. Use field name 'images'."}), 400
+
+    job_id = job_queue.submit(list(read_uploads(request.files.getlist('images'))))
+    return jsonify({
+        "job_id": job_id,
+        "status_url": url_for(".job_status", job_id=job_id),
+        "events_url": url_for(".job_events", job_id=job_id),
+    }), 202
+
+@bp.get("/api/jobs/<job_id>")
+def job_status(job_id):
+    job = job_queue.get(job_id)
+    if job is None:
+        return jsonify({"error": "Unknown job."}), 404
+    return jsonify(job)
+
+@bp.get("/api/jobs/<job_id>/events")
+def job_events(job_id):
+    """Server-sent events: one `result` event per finished image, then `done`"""
+    if job_queue.get(job_id) is None:
+        return jsonify({"error": "Unknown job."}), 404
+
+    def events():
+        sent = set()
+        last_sent = time.monotonic()
+        while True:
+            job = job_queue.get(job_id)
+            if job is None:
+                return
+            fresh = [out for out in job["results"] if out["index"] not in sent]
+            for out in fresh:
+                sent.add(out["index"])
+                yield f"event: result\ndata: {json.dumps(out)}\n\n"
+            if job["status"] == "done":
+                yield f"event: done\ndata: {json.dumps({'job_id': job_id, 'total': job['total']})}\n\n"
+                return
+            if fresh:
+                last_sent = time.monotonic()
+            elif time.monotonic() - last_sent >= JOB_EVENTS_KEEPALIVE:
+                # Comment line so proxies do not close an idle stream
+                yield ": keep-alive\n\n"
+                last_sent = time.monotonic()
+            # Results finished in this process wake us at once; other processes' are seen at the next poll
+            job_queue.wait(job_queue.poll_interval)
+
+    return Response(events(), mimetype="text/event-stream", headers={"Cache-Control": "no-cache"})
+
+def create_app():
+    """Build the Flask app and start this process's job workers (call once per serving process, after any fork)"""
+    app = Flask(__name__)
+    app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
+    app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
+    CORS(app, resources={r"/api/*": {"origins": CORS_ORIGINS.split(",")}})
+    app.register_blueprint(bp)
+    job_queue.start()
+    return app
+
 if __name__ == "__main__":
-    CORS(app, resources={r"/api/*": {"origins": "*"}})
     print("Starting Flask server on http://localhost:5000")
-    app.run(host="0.0.0.0", port=5000, debug=True)
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
@@ -0,0 +1,125 @@
+"""Benchmark report extraction on recorded or generated model outputs.
+
+Usage (from AtharvProj/):
+
+    python bench_report.py --corpus recorded/
+    python bench_report.py --samples 2000 --repeat 5
+
+A corpus is a directory of raw model replies. Each `.txt` file holds the
+reply text and each `.json` file holds a full generateContent response.
+Running the app with GEMINI_RECORD_DIR set fills such a directory. Without
+`--corpus`, replies are generated in the shapes seen in practice: fenced,
+wrapped in prose, with stray braces, long lists, and truncated.
+
+Both the old two-pass regex cleanup and the linear extractor in report.py
+are timed. The script reports how many replies each one parsed and how many
+passed schema validation.
+"""
+import argparse
+import json
+import os
+import random
+import re
+import sys
+import time
+
+from report import ReportError, extract_json_object, validate_report
+
+
+def legacy_extract(text):
+    """The regex cleanup that used to live in app.clean_json"""
+    cleaned = re.sub(r"```(?:json|JSON)?", "", text).strip()
+    cleaned = cleaned.replace("```", "").strip()
+    match = re.search(r"\{.*\}", cleaned, re.DOTALL)
+    if not match:
+        raise ValueError("No valid JSON object found.")
+    return json.loads(match.group())
+
+
+def load_corpus(directory):
+    samples = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        with open(path, encoding="utf-8") as f:
+            raw = f.read()
+        if name.endswith(".json"):
+            try:
+                raw = json.loads(raw)["candidates"][0]["content"]["parts"][0]["text"]
+            except (ValueError, KeyError, IndexError, TypeError):
+                continue
+        elif not name.endswith(".txt"):
+            continue
+        samples.append((name, raw))
+    return samples
+
+
+def make_report(rng, n_items):
+    return {
+        "sustainability_score": rng.randint(1, 10),
+        "items": [{"name": f"Item {i}", "description": "Plastic chair with {curly} trim"} for i in range(n_items)],
+        "greener_alternatives": [{"name": f"Item {i}", "alternative": "Use bamboo \"eco\" furniture"} for i in range(n_items)],
+        "temperature_regulation_suggestions": ["Close blinds in the afternoon", "Seal window gaps"],
+    }
+
+
+def generate_samples(count, seed=0):
+    rng = random.Random(seed)
+    shapes = ["plain", "fenced", "prose", "stray_brace", "long", "truncated"]
+    samples = []
+    for i in range(count):
+        shape = shapes[i % len(shapes)]
+        body = json.dumps(make_report(rng, 200 if shape == "long" else rng.randint(2, 12)), indent=2)
+        if shape == "fenced":
+            text = f"```json\n{body}\n```"
+        elif shape == "prose":
+            text = f"Here is the analysis you asked for:\n{body}\nLet me know if you need more."
+        elif shape == "stray_brace":
+            text = f"Output {{as requested}}:\n```json\n{body}\n```\nNote: values are estimates }}"
+        elif shape == "truncated":
+            text = "```json\n" + body[: len(body) // 2] + "{" * 2000
+        else:
+            text = body
+        samples.append((f"{shape}-{i}", text))
+    return samples
+
+
+def run(extract, samples, repeat):
+    parsed = valid = 0
+    start = time.perf_counter()
+    for _ in range(repeat):
+        for _, text in samples:
+            try:
+                data = extract(text)
+            except ValueError:
+                continue
+            parsed += 1
+            try:
+                validate_report(data)
+                valid += 1
+            except ReportError:
+                pass
+    elapsed = time.perf_counter() - start
+    return elapsed / repeat, parsed // repeat, valid // repeat
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--corpus", help="directory of recorded model replies")
+    parser.add_argument("--samples", type=int, default=1200, help="generated replies when no corpus is given")
+    parser.add_argument("--repeat", type=int, default=3)
+    args = parser.parse_args(argv)
+
+    samples = load_corpus(args.corpus) if args.corpus else generate_samples(args.samples)
+    if not samples:
+        sys.exit("No samples found.")
+    total_bytes = sum(len(text) for _, text in samples)
+    print(f"{len(samples)} replies, {total_bytes / 1e6:.1f} MB")
+
+    for name, extract in (("regex (legacy)", legacy_extract), ("linear scan", extract_json_object)):
+        seconds, parsed, valid = run(extract, samples, args.repeat)
+        print(f"{name:>15}: {seconds * 1000:8.1f} ms/pass  {total_bytes / seconds / 1e6:7.1f} MB/s  "
+              f"parsed {parsed}/{len(samples)}  valid {valid}/{len(samples)}")
+
+
+if __name__ == "__main__":
+    main()
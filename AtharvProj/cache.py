@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import OrderedDict
+
+
+class ResponseCache:
+    """Two-tier cache of model results, keyed by a hash of the image bytes, prompt and model URL.
+
+    The memory tier is a bounded LRU. The optional disk tier stores one JSON
+    file per entry under `disk_dir`, expires entries after `ttl` seconds and
+    deletes the oldest files once the directory grows past `max_disk_bytes`.
+    Values are kept serialized so callers always get their own copy to modify.
+    """
+
+    def __init__(self, max_entries=256, disk_dir=None, ttl=7 * 24 * 3600, max_disk_bytes=256 * 1024 * 1024):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir
+        self.ttl = ttl
+        self.max_disk_bytes = max_disk_bytes
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {"memory_hits": 0, "disk_hits": 0, "misses": 0, "stores": 0, "evictions": 0}
+        self._disk_bytes = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._disk_bytes = sum(size for _, _, size in self._disk_entries())
+
+    @staticmethod
+    def key(image_bytes, prompt, model_url, *extra):
+        digest = hashlib.sha256()
+        for part in (model_url.encode(), prompt.encode(), *(str(e).encode() for e in extra), image_bytes):
+            digest.update(len(part).to_bytes(8, "big"))
+            digest.update(part)
+        return digest.hexdigest()
+
+    def get(self, key):
+        now = time.time()
+        with self._lock:
+            entry = self._memory.get(key)
+            if entry is not None:
+                expires, payload = entry
+                if expires > now:
+                    self._memory.move_to_end(key)
+                    self._stats["memory_hits"] += 1
+                    return json.loads(payload)
+                del self._memory[key]
+
+        payload = self._disk_get(key, now)
+        with self._lock:
+            if payload is None:
+                self._stats["misses"] += 1
+                return None
+            self._stats["disk_hits"] += 1
+            self._memory_put(key, payload, now + self.ttl)
+        return json.loads(payload)
+
+    def put(self, key, value):
+        payload = json.dumps(value)
+        with self._lock:
+            self._stats["stores"] += 1
+            self._memory_put(key, payload, time.time() + self.ttl)
+        self._disk_put(key, payload)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            lookups = stats["memory_hits"] + stats["disk_hits"] + stats["misses"]
+            stats["hit_rate"] = (stats["memory_hits"] + stats["disk_hits"]) / lookups if lookups else 0.0
+            stats["memory_entries"] = len(self._memory)
+            stats["disk_bytes"] = self._disk_bytes
+            return stats
+
+    def _memory_put(self, key, payload, expires):
+        if self.max_entries <= 0:
+            return
+        self._memory[key] = (expires, payload)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _path(self, key):
+        return os.path.join(self.disk_dir, key[:2], key + ".json")
+
+    def _disk_get(self, key, now):
+        if not self.disk_dir:
+            return None
+        path = self._path(key)
+        try:
+            if os.path.getmtime(path) + self.ttl <= now:
+                self._disk_remove(path)
+                return None
+            with open(path, encoding="utf-8") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def _disk_put(self, key, payload):
+        if not self.disk_dir:
+            return
+        path = self._path(key)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{threading.get_ident()}.tmp"
+        data = payload.encode("utf-8")
+        try:
+            old_size = os.path.getsize(path) if os.path.exists(path) else 0
+            with open(tmp, "wb") as f:
+                f.write(data)
+            os.replace(tmp, path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes += len(data) - old_size
+            over = self._disk_bytes > self.max_disk_bytes
+        if over:
+            self._disk_evict()
+
+    def _disk_remove(self, path):
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+        except OSError:
+            return
+        with self._lock:
+            self._disk_bytes -= size
+            self._stats["evictions"] += 1
+
+    def _disk_entries(self):
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if name.endswith(".json"):
+                    path = os.path.join(root, name)
+                    try:
+                        stat = os.stat(path)
+                    except OSError:
+                        continue
+                    yield path, stat.st_mtime, stat.st_size
+
+    def _disk_evict(self):
+        """Drop expired files, then the oldest ones until the tier is back under 90% of its budget"""
+        now = time.time()
+        target = self.max_disk_bytes * 0.9
+        for path, mtime, _ in sorted(self._disk_entries(), key=lambda entry: entry[1]):
+            if mtime + self.ttl > now and self._disk_bytes <= target:
+                break
+            self._disk_remove(path)
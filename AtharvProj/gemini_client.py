@@ -0,0 +1,82 @@
+import random
+import time
+from contextlib import nullcontext
+from email.utils import parsedate_to_datetime
+
+import requests
+from requests.adapters import HTTPAdapter
+
+# Responses worth retrying: rate limiting and transient server errors
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class GeminiClient:
+    """Keep-alive HTTP client for the Gemini generateContent endpoint.
+
+    One pooled `requests.Session` is shared by all threads, so calls reuse
+    TCP+TLS connections instead of handshaking every time. Failed calls
+    (connection errors, timeouts, 429 and 5xx) are retried with capped
+    exponential backoff and full jitter, so that many clients backing off at
+    once do not retry in lockstep. A Retry-After header from the server takes
+    precedence over the computed delay. With a `limiter` (see ratelimit.py),
+    every attempt, retries included, first waits for a slot under `client`.
+    """
+
+    def __init__(self, api_url, api_key, timeout=60, pool_size=10, retries=3, backoff=0.5, max_backoff=30, limiter=None):
+        self.api_url = api_url
+        self.api_key = api_key
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.max_backoff = max_backoff
+        self.limiter = limiter
+
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.session.headers.update({"Content-Type": "application/json"})
+
+    def generate(self, payload, client=None):
+        """POST a generateContent payload (dict or serialized JSON bytes) with retries; returns the final response"""
+        body = {"data": payload} if isinstance(payload, bytes) else {"json": payload}
+        for attempt in range(self.retries + 1):
+            last_attempt = attempt == self.retries
+            try:
+                with self.limiter.slot(client) if self.limiter else nullcontext():
+                    response = self.session.post(
+                        self.api_url,
+                        params={"key": self.api_key},
+                        timeout=self.timeout,
+                        **body
+                    )
+            except (requests.ConnectionError, requests.Timeout):
+                if last_attempt:
+                    raise
+                delay = self._backoff_delay(attempt)
+            else:
+                if response.status_code not in RETRY_STATUSES or last_attempt:
+                    return response
+                delay = self._retry_after(response)
+                if delay is None:
+                    delay = self._backoff_delay(attempt)
+                response.close()
+
+            time.sleep(min(delay, self.max_backoff))
+
+    def _backoff_delay(self, attempt):
+        return random.uniform(0, self.backoff * (2 ** attempt))
+
+    @staticmethod
+    def _retry_after(response):
+        value = response.headers.get("Retry-After")
+        if not value:
+            return None
+        try:
+            return max(0.0, float(value))
+        except ValueError:
+            pass
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
@@ -0,0 +1,29 @@
+"""Production serving profile for AtharvProj.
+
+    gunicorn -c AtharvProj/gunicorn.conf.py
+    ATHARV_WORKER_CLASS=gevent ATHARV_WORKER_CONNECTIONS=500 gunicorn -c AtharvProj/gunicorn.conf.py
+
+Request time is almost all spent waiting on Gemini, so the choice is how
+cheaply a worker can hold many open requests: gthread uses one OS thread
+per request, gevent one greenlet. Streaming responses (NDJSON, job events)
+hold theirs for the whole analysis. Outbound calls are capped per process
+by GEMINI_MAX_CONCURRENCY/GEMINI_RPS whatever the worker class. The app is
+not preloaded, because create_app() starts the job queue's threads, which
+must run in the worker and not in the master.
+"""
+import os
+
+wsgi_app = "wsgi:app"
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.getenv("ATHARV_BIND", "0.0.0.0:5000")
+workers = int(os.getenv("ATHARV_HTTP_WORKERS", "2"))
+worker_class = os.getenv("ATHARV_WORKER_CLASS", "gthread")
+threads = int(os.getenv("ATHARV_HTTP_THREADS", "16"))
+worker_connections = int(os.getenv("ATHARV_WORKER_CONNECTIONS", "500"))
+# Long enough for a full analysis; gthread/gevent workers keep heartbeating while requests wait
+timeout = int(os.getenv("ATHARV_HTTP_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+preload_app = False
+accesslog = os.getenv("ATHARV_ACCESS_LOG", "-")
@@ -0,0 +1,93 @@
+import base64
+import io
+import json
+
+from PIL import Image, ImageOps
+
+# Magic numbers of the image formats we recognise in uploads
+SIGNATURES = (
+    (b"\xff\xd8\xff", "image/jpeg"),
+    (b"\x89PNG\r\n\x1a\n", "image/png"),
+    (b"GIF87a", "image/gif"),
+    (b"GIF89a", "image/gif"),
+)
+
+PIL_FORMATS = {"JPEG": "image/jpeg", "WEBP": "image/webp", "PNG": "image/png"}
+
+# Formats that can be sent to the model as they are
+PASSTHROUGH_MIMES = ("image/jpeg", "image/png", "image/webp")
+
+# Base64 turns every 3 input bytes into 4, so chunks must be multiples of 3
+B64_CHUNK = 3 * 64 * 1024
+
+
+def sniff_mime(data):
+    """Return the image MIME type from the file's magic number, or None if it is not a known image"""
+    for signature, mime in SIGNATURES:
+        if data.startswith(signature):
+            return mime
+    if data[:4] == b"RIFF" and data[8:12] == b"WEBP":
+        return "image/webp"
+    if data[4:12] in (b"ftypheic", b"ftypheix", b"ftypmif1"):
+        return "image/heic"
+    return None
+
+
+def normalize_image(data, max_edge=1536, fmt="JPEG", quality=85):
+    """Downscale an upload to at most `max_edge` pixels and re-encode it; returns (bytes, mime).
+
+    Images that are already small enough and in a format the model accepts are
+    passed through untouched, so they are not recompressed for no gain.
+    """
+    mime = sniff_mime(data)
+    if mime is None:
+        raise ValueError("Unsupported image format.")
+    if mime == "image/heic":
+        # Pillow cannot decode HEIC without a plugin, but the model accepts it directly
+        return data, mime
+
+    with Image.open(io.BytesIO(data)) as img:
+        needs_rotation = img.getexif().get(0x0112, 1) != 1
+        if max(img.size) <= max_edge and not needs_rotation and mime in PASSTHROUGH_MIMES:
+            return data, mime
+
+        # Let libjpeg decode at a reduced scale when the photo is much larger than needed
+        if img.format == "JPEG":
+            img.draft("RGB", (max_edge, max_edge))
+        img = ImageOps.exif_transpose(img)
+        img.thumbnail((max_edge, max_edge), Image.LANCZOS)
+
+        if fmt == "JPEG" and img.mode != "RGB":
+            if img.mode in ("RGBA", "LA", "P"):
+                img = img.convert("RGBA")
+                background = Image.new("RGB", img.size, "white")
+                background.paste(img, mask=img.getchannel("A"))
+                img = background
+            else:
+                img = img.convert("RGB")
+
+        out = io.BytesIO()
+        img.save(out, format=fmt, quality=quality)
+        return out.getvalue(), PIL_FORMATS[fmt]
+
+
+def build_request_body(prompt, mime_type, image_bytes, extra=None):
+    """Serialize a generateContent request, base64-encoding the image chunk by chunk into the body.
+
+    This skips building the base64 text as a Python str and having json.dumps
+    scan and escape it. `extra` holds additional top-level request fields.
+    """
+    head = (
+        '{"contents": [{"parts": [{"text": %s}, {"inline_data": {"mime_type": %s, "data": "'
+        % (json.dumps(prompt), json.dumps(mime_type))
+    )
+    tail = '"}}]}]'
+    if extra:
+        tail += ", " + json.dumps(extra)[1:-1]
+    tail += "}"
+
+    view = memoryview(image_bytes)
+    parts = [head.encode("utf-8")]
+    parts.extend(base64.b64encode(view[i:i + B64_CHUNK]) for i in range(0, len(view), B64_CHUNK))
+    parts.append(tail.encode("utf-8"))
+    return b"".join(parts)
@@ -0,0 +1,244 @@
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    created REAL NOT NULL,
+    total INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS tasks (
+    job_id TEXT NOT NULL,
+    idx INTEGER NOT NULL,
+    filename TEXT,
+    image BLOB,
+    status TEXT NOT NULL,
+    result TEXT,
+    updated REAL NOT NULL,
+    claim TEXT,
+    PRIMARY KEY (job_id, idx)
+);
+CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status);
+"""
+
+
+class JobQueue:
+    """Persistent job queue backed by a local SQLite file; no external broker needed.
+
+    Uploads are written to the database and a job ID is returned at once.
+    `workers` background threads claim queued images one at a time, run
+    `analyze(image_bytes, job_id)` on them and store the result. Claims happen in an
+    IMMEDIATE transaction, so several processes can share one database file.
+    While an image is analyzed its claim is renewed every `lease / 3` seconds;
+    one whose claim is not renewed within `lease` seconds (its process died)
+    is handed out again. Each claim carries a token and a result is only
+    stored under the token that is still current, so an analysis that was
+    handed out twice is never recorded twice.
+
+    Nothing touches the database until `start()`, so the queue can be created
+    at import time in a process that later forks.
+    """
+
+    def __init__(self, path, analyze, workers=4, poll_interval=1.0, retention=24 * 3600, lease=600):
+        self.path = path
+        self.analyze = analyze
+        self.workers = workers
+        self.poll_interval = poll_interval
+        self.retention = retention
+        self.lease = lease
+        self._local = threading.local()
+        self._changed = threading.Condition()
+        self._threads = []
+        # claim token -> (job_id, idx) of the tasks this process is analyzing
+        self._held = {}
+        self._held_lock = threading.Lock()
+
+    def _conn(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is None or self._local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+            self._local.pid = os.getpid()
+        return conn
+
+    def start(self):
+        conn = self._conn()
+        conn.executescript(SCHEMA)
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._work, name=f"job-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+        thread = threading.Thread(target=self._heartbeat, name="job-heartbeat", daemon=True)
+        thread.start()
+        self._threads.append(thread)
+
+    def submit(self, uploads):
+        """Persist a job; `uploads` holds (idx, filename, image_bytes, error) with bytes None on error"""
+        job_id = uuid.uuid4().hex
+        now = time.time()
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            conn.execute("INSERT INTO jobs (id, created, total) VALUES (?, ?, ?)", (job_id, now, len(uploads)))
+            conn.executemany(
+                "INSERT INTO tasks (job_id, idx, filename, image, status, result, updated) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                [
+                    (job_id, idx, filename, image, "queued" if error is None else "done",
+                     None if error is None else json.dumps({"error": error}), now)
+                    for idx, filename, image, error in uploads
+                ],
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        self._notify()
+        return job_id
+
+    def get(self, job_id):
+        """Return the job's status and the results finished so far, or None for an unknown job"""
+        conn = self._conn()
+        job = conn.execute("SELECT created, total FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if job is None:
+            return None
+
+        rows = conn.execute(
+            "SELECT idx, filename, status, result FROM tasks WHERE job_id = ? ORDER BY idx", (job_id,)
+        ).fetchall()
+        results = []
+        for idx, filename, status, result in rows:
+            if status == "done":
+                out = json.loads(result)
+                out.update({"index": idx, "filename": filename})
+                results.append(out)
+
+        done = len(results)
+        started = any(status != "queued" for _, _, status, _ in rows)
+        return {
+            "job_id": job_id,
+            "status": "done" if done == job[1] else ("running" if started else "queued"),
+            "created": job[0],
+            "total": job[1],
+            "done": done,
+            "results": results,
+        }
+
+    def stats(self):
+        rows = self._conn().execute("SELECT status, COUNT(*) FROM tasks GROUP BY status").fetchall()
+        counts = {"queued": 0, "running": 0, "done": 0}
+        counts.update(dict(rows))
+        return counts
+
+    def wait(self, timeout):
+        """Block until some task finishes (or `timeout` seconds pass)"""
+        with self._changed:
+            self._changed.wait(timeout)
+
+    def _notify(self):
+        with self._changed:
+            self._changed.notify_all()
+
+    def _claim(self):
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            now = time.time()
+            conn.execute(
+                "UPDATE tasks SET status = 'queued' WHERE status = 'running' AND updated < ?", (now - self.lease,)
+            )
+            row = conn.execute(
+                "SELECT job_id, idx, image FROM tasks WHERE status = 'queued' ORDER BY rowid LIMIT 1"
+            ).fetchone()
+            if row is not None:
+                token = uuid.uuid4().hex
+                conn.execute(
+                    "UPDATE tasks SET status = 'running', updated = ?, claim = ? WHERE job_id = ? AND idx = ?",
+                    (now, token, row[0], row[1]),
+                )
+                row = row + (token,)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return row
+
+    def _finish(self, job_id, idx, token, result):
+        """Store the result if the claim is still ours; returns False if the task was handed out again"""
+        # The image is dropped once analyzed; only the (small) result is kept
+        cursor = self._conn().execute(
+            "UPDATE tasks SET status = 'done', result = ?, image = NULL, updated = ?"
+            " WHERE job_id = ? AND idx = ? AND status = 'running' AND claim = ?",
+            (json.dumps(result), time.time(), job_id, idx, token),
+        )
+        self._notify()
+        return cursor.rowcount == 1
+
+    def _store(self, job_id, idx, token, result, attempts=5):
+        """_finish with retries, so a locked database neither loses the result nor kills the worker"""
+        for attempt in range(1, attempts + 1):
+            try:
+                if not self._finish(job_id, idx, token, result):
+                    print(f"job queue: result for {job_id}/{idx} dropped, its claim expired")
+                return
+            except sqlite3.Error as e:
+                print(f"job queue error storing {job_id}/{idx} (attempt {attempt}/{attempts}): {e}")
+                time.sleep(self.poll_interval * attempt)
+        # Left as running; once the claim expires another worker analyzes it again
+
+    def _heartbeat(self):
+        """Renew the claims of tasks being analyzed in this process"""
+        while True:
+            time.sleep(self.lease / 3)
+            with self._held_lock:
+                held = list(self._held.items())
+            if not held:
+                continue
+            try:
+                self._conn().executemany(
+                    "UPDATE tasks SET updated = ? WHERE job_id = ? AND idx = ? AND status = 'running' AND claim = ?",
+                    [(time.time(), job_id, idx, token) for token, (job_id, idx) in held],
+                )
+            except sqlite3.Error as e:
+                print(f"job queue error renewing claims: {e}")
+
+    def _purge(self):
+        cutoff = time.time() - self.retention
+        conn = self._conn()
+        conn.execute("DELETE FROM tasks WHERE job_id IN (SELECT id FROM jobs WHERE created < ?)", (cutoff,))
+        conn.execute("DELETE FROM jobs WHERE created < ?", (cutoff,))
+
+    def _work(self):
+        last_purge = 0
+        while True:
+            try:
+                if time.time() - last_purge > 3600:
+                    self._purge()
+                    last_purge = time.time()
+                claimed = self._claim()
+            except sqlite3.Error as e:
+                print(f"job queue error: {e}")
+                time.sleep(self.poll_interval)
+                continue
+
+            if claimed is None:
+                self.wait(self.poll_interval)
+                continue
+
+            job_id, idx, image, token = claimed
+            with self._held_lock:
+                self._held[token] = (job_id, idx)
+            try:
+                result = self.analyze(bytes(image), job_id)
+            except Exception as e:
+                result = {"error": str(e)}
+            try:
+                self._store(job_id, idx, token, result)
+            finally:
+                with self._held_lock:
+                    del self._held[token]
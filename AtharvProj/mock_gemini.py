@@ -0,0 +1,137 @@
+"""Local stand-in for the Gemini generateContent endpoint.
+
+Usage (from AtharvProj/):
+
+    python mock_gemini.py --port 8081 --latency 0.5 --error-rate 0.05 --malformed-rate 0.1
+    GEMINI_API_KEY=test GEMINI_API_URL=http://127.0.0.1:8081/v1beta/models/mock:generateContent python app.py
+
+Every request gets a canned sustainability report. When the request sets
+generationConfig.responseMimeType to application/json, the report comes
+back as bare JSON, as the real API does in structured output mode.
+Otherwise it is wrapped in a code fence and a line of prose. `--error-rate`
+answers that fraction of requests with 429 or 503. `--malformed-rate`
+replies with a broken report (bad score, missing field), which exercises
+validation and the repair retry. Counters are served at GET /stats.
+"""
+import argparse
+import json
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+REPORT = {
+    "sustainability_score": 6,
+    "items": [
+        {"name": "Desk lamp", "description": "Incandescent bulb, metal shade"},
+        {"name": "Office chair", "description": "Plastic frame with foam seat"},
+    ],
+    "greener_alternatives": [
+        {"name": "Desk lamp", "alternative": "Switch to an LED bulb"},
+        {"name": "Office chair", "alternative": "Choose recycled aluminium or FSC wood"},
+    ],
+    "temperature_regulation_suggestions": ["Close blinds during afternoon sun", "Seal gaps around the window frame"],
+}
+MALFORMED = {"sustainability_score": "high", "items": []}
+
+
+class MockGemini(ThreadingHTTPServer):
+    daemon_threads = True
+
+    def __init__(self, address, latency=0.0, error_rate=0.0, malformed_rate=0.0, seed=None):
+        super().__init__(address, Handler)
+        self.latency = latency
+        self.error_rate = error_rate
+        self.malformed_rate = malformed_rate
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.stats = {"requests": 0, "errors": 0, "malformed": 0, "structured": 0, "repairs": 0}
+
+    def count(self, key):
+        with self.lock:
+            self.stats[key] += 1
+
+    def roll(self, rate):
+        with self.lock:
+            return self.random.random() < rate
+
+
+class Handler(BaseHTTPRequestHandler):
+    def log_message(self, format, *args):
+        pass
+
+    def send_json(self, status, payload, headers=()):
+        body = json.dumps(payload).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in headers:
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        if self.path.rstrip("/") == "/stats":
+            with self.server.lock:
+                self.send_json(200, dict(self.server.stats))
+        else:
+            self.send_json(404, {"error": {"code": 404, "message": "Not found"}})
+
+    def do_POST(self):
+        server = self.server
+        try:
+            request = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))))
+        except ValueError:
+            self.send_json(400, {"error": {"code": 400, "message": "Invalid JSON payload"}})
+            return
+
+        server.count("requests")
+        if server.latency:
+            time.sleep(server.latency)
+
+        if server.roll(server.error_rate):
+            server.count("errors")
+            status = 429 if server.roll(0.5) else 503
+            self.send_json(status, {"error": {"code": status, "message": "Mock overload"}}, [("Retry-After", "1")])
+            return
+
+        structured = (request.get("generationConfig") or {}).get("responseMimeType") == "application/json"
+        parts = request["contents"][0]["parts"]
+        # A text-only request is a repair follow-up; always answer it correctly
+        repair = not any("inline_data" in part or "inlineData" in part for part in parts)
+        if structured:
+            server.count("structured")
+        if repair:
+            server.count("repairs")
+
+        report = REPORT
+        if not repair and server.roll(server.malformed_rate):
+            server.count("malformed")
+            report = MALFORMED
+
+        text = json.dumps(report)
+        if not structured:
+            text = f"Here is the analysis:\n```json\n{json.dumps(report, indent=2)}\n```"
+        self.send_json(200, {"candidates": [{"content": {"role": "model", "parts": [{"text": text}]}}]})
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency", type=float, default=0.0, help="seconds added to every reply")
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction of requests answered 429/503")
+    parser.add_argument("--malformed-rate", type=float, default=0.0, help="fraction of replies that fail validation")
+    parser.add_argument("--seed", type=int)
+    args = parser.parse_args(argv)
+
+    server = MockGemini((args.host, args.port), args.latency, args.error_rate, args.malformed_rate, args.seed)
+    print(f"Mock Gemini on http://{args.host}:{server.server_port}/v1beta/models/mock:generateContent")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
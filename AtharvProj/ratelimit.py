@@ -0,0 +1,254 @@
+import sqlite3
+import threading
+import time
+from collections import Counter, OrderedDict, deque
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+
+class QueueTimeout(Exception):
+    pass
+
+
+class TokenBucket:
+    """In-process token bucket: `rate` tokens per second, holding at most `burst`"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self._tokens = burst
+        self._updated = time.monotonic()
+
+    def take(self):
+        """Take a token if one is available; otherwise return seconds until the next one (caller holds the lock)"""
+        now = time.monotonic()
+        self._tokens = min(self.burst, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return 0.0
+        return (1 - self._tokens) / self.rate
+
+
+class SqliteTokenBucket:
+    """Token bucket whose state lives in a SQLite file, so every process pointing at it shares one quota"""
+
+    def __init__(self, rate, burst, path):
+        self.rate = rate
+        self.burst = burst
+        self._conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS bucket (id INTEGER PRIMARY KEY, tokens REAL, updated REAL)")
+        self._conn.execute("INSERT OR IGNORE INTO bucket VALUES (1, ?, ?)", (burst, time.time()))
+
+    def take(self):
+        # Wall-clock time, since monotonic clocks are not comparable across processes
+        conn = self._conn
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            tokens, updated = conn.execute("SELECT tokens, updated FROM bucket WHERE id = 1").fetchone()
+            now = time.time()
+            tokens = min(self.burst, tokens + max(0.0, now - updated) * self.rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / self.rate
+            conn.execute("UPDATE bucket SET tokens = ?, updated = ? WHERE id = 1", (tokens, now))
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return wait
+
+
+class RateLimiter:
+    """Admission control for outbound model calls: a token bucket plus a ceiling on calls in flight.
+
+    Callers wait in per-client queues, so one large upload cannot starve
+    everyone else: whenever a token and a slot are free, the waiting client
+    with the fewest calls in flight goes next, round-robin among ties. Time spent waiting is recorded
+    and reported by `stats()`. With `state_path` set the token bucket is
+    shared through a SQLite file by every process using it; the in-flight
+    ceiling is always per process. A `rate` of 0 leaves only the ceiling.
+    """
+
+    def __init__(self, rate, burst=None, max_concurrency=4, state_path=None, queue_timeout=None, window=1024):
+        # A bucket that never holds a whole token would never grant one
+        burst = max(1.0, burst or rate)
+        if rate <= 0:
+            self.bucket = None
+        elif state_path:
+            self.bucket = SqliteTokenBucket(rate, burst, state_path)
+        else:
+            self.bucket = TokenBucket(rate, burst)
+        self.max_concurrency = max_concurrency
+        self.queue_timeout = queue_timeout
+        self._lock = threading.Lock()
+        self._queues = OrderedDict()
+        self._active = Counter()
+        self._in_flight = 0
+        self._waits = deque(maxlen=window)
+        self._stats = {"granted": 0, "timeouts": 0, "wait_seconds_total": 0.0, "wait_seconds_max": 0.0}
+
+    @contextmanager
+    def slot(self, client=None):
+        """Hold one call slot for the duration of the block"""
+        self.acquire(client)
+        try:
+            yield
+        finally:
+            self.release(client)
+
+    def acquire(self, client=None):
+        waiter = threading.Event()
+        start = time.monotonic()
+        deadline = start + self.queue_timeout if self.queue_timeout else None
+
+        with self._lock:
+            self._queues.setdefault(client, deque()).append(waiter)
+        while True:
+            with self._lock:
+                delay = self._dispatch()
+                if waiter.is_set():
+                    self._record_wait(time.monotonic() - start)
+                    return
+                if deadline is not None and time.monotonic() >= deadline:
+                    self._remove(client, waiter)
+                    self._stats["timeouts"] += 1
+                    raise QueueTimeout("Timed out waiting for a model call slot.")
+
+            timeout = delay
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                timeout = remaining if timeout is None else min(timeout, remaining)
+            waiter.wait(timeout)
+
+    def release(self, client=None):
+        with self._lock:
+            self._in_flight -= 1
+            self._active[client] -= 1
+            if not self._active[client]:
+                del self._active[client]
+            self._dispatch()
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            waits = sorted(self._waits)
+            stats["in_flight"] = self._in_flight
+            stats["waiting"] = sum(len(q) for q in self._queues.values())
+            stats["waiting_clients"] = len(self._queues)
+        stats["wait_seconds_avg"] = stats["wait_seconds_total"] / stats["granted"] if stats["granted"] else 0.0
+        for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99)):
+            stats[f"wait_seconds_{name}"] = waits[min(len(waits) - 1, int(q * len(waits)))] if waits else 0.0
+        return stats
+
+    def _dispatch(self):
+        """Grant slots to the least busy clients; returns seconds until a token frees up, or None (lock held)"""
+        while self._queues and self._in_flight < self.max_concurrency:
+            delay = self.bucket.take() if self.bucket else 0.0
+            if delay > 0:
+                return delay
+            client = min(self._queues, key=self._active.__getitem__)
+            queue = self._queues.pop(client)
+            waiter = queue.popleft()
+            # Rotate: this client goes to the back of the line
+            if queue:
+                self._queues[client] = queue
+            self._in_flight += 1
+            self._active[client] += 1
+            waiter.set()
+        return None
+
+    def _remove(self, client, waiter):
+        queue = self._queues[client]
+        queue.remove(waiter)
+        if not queue:
+            del self._queues[client]
+
+    def _record_wait(self, seconds):
+        self._stats["granted"] += 1
+        self._stats["wait_seconds_total"] += seconds
+        self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], seconds)
+        self._waits.append(seconds)
+
+
+class FairExecutor:
+    """Thread pool that hands queued work to free threads round-robin across clients.
+
+    A ThreadPoolExecutor runs tasks first-in, first-out, so a large upload
+    would occupy every thread before a later small one is even picked up,
+    and the limiter's fair queue would never see the small one. Here each
+    client has its own queue, and a free thread takes the next task of the
+    client with the fewest tasks running, round-robin among ties. A newly
+    arrived upload therefore gets the next free thread. Threads are started
+    on demand, up to `max_workers`.
+    """
+
+    def __init__(self, max_workers, thread_name_prefix="fair"):
+        self.max_workers = max_workers
+        self.thread_name_prefix = thread_name_prefix
+        self._cond = threading.Condition()
+        self._queues = OrderedDict()
+        self._running = Counter()
+        self._threads = []
+        # Threads not running a task (including ones just started), and tasks not yet taken
+        self._idle = 0
+        self._pending = 0
+
+    def submit(self, client, fn, /, *args, **kwargs):
+        future = Future()
+        with self._cond:
+            self._queues.setdefault(client, deque()).append((future, fn, args, kwargs))
+            self._pending += 1
+            # Woken threads only take their task once they get the lock back, so compare counts
+            # rather than waiting for _idle to drop; a burst then starts its threads right away
+            if self._pending > self._idle and len(self._threads) < self.max_workers:
+                thread = threading.Thread(
+                    target=self._work, name=f"{self.thread_name_prefix}_{len(self._threads)}", daemon=True
+                )
+                self._threads.append(thread)
+                self._idle += 1
+                thread.start()
+            self._cond.notify()
+        return future
+
+    def pending(self):
+        with self._cond:
+            return self._pending
+
+    def _next(self):
+        """Pop the next task of the least busy client, rotating that client to the back (lock held)"""
+        client = min(self._queues, key=self._running.__getitem__)
+        queue = self._queues.pop(client)
+        task = queue.popleft()
+        if queue:
+            self._queues[client] = queue
+        self._running[client] += 1
+        return client, task
+
+    def _work(self):
+        while True:
+            with self._cond:
+                while not self._queues:
+                    self._cond.wait()
+                self._idle -= 1
+                self._pending -= 1
+                client, (future, fn, args, kwargs) = self._next()
+
+            try:
+                # Skipped if cancelled while queued (e.g. the request's deadline passed)
+                if future.set_running_or_notify_cancel():
+                    try:
+                        result = fn(*args, **kwargs)
+                    except BaseException as e:
+                        future.set_exception(e)
+                    else:
+                        future.set_result(result)
+            finally:
+                with self._cond:
+                    self._running[client] -= 1
+                    if not self._running[client]:
+                        del self._running[client]
+                    self._idle += 1
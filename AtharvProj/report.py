@@ -0,0 +1,200 @@
+import json
+import numbers
+import re
+from dataclasses import dataclass
+from typing import List
+
+# Braces and quotes are the only characters the scanner stops at; strings are skipped whole
+_STRUCTURAL = re.compile(r'[{}"]')
+_STRING = re.compile(r'"(?:[^"\\]|\\.)*"', re.DOTALL)
+_decoder = json.JSONDecoder()
+
+
+class ReportError(ValueError):
+    pass
+
+
+def _balanced_end(text, start, stop):
+    """Index just past the brace that closes the one at `start`, or None if it closes before `stop`"""
+    depth = 0
+    pos = start
+    while True:
+        match = _STRUCTURAL.search(text, pos, stop)
+        if match is None:
+            return None
+        pos = match.start()
+        if text[pos] == '"':
+            string = _STRING.match(text, pos, stop)
+            if string is None:
+                return None
+            pos = string.end()
+            continue
+        depth += 1 if text[pos] == "{" else -1
+        pos += 1
+        if depth == 0:
+            return pos
+
+
+def extract_json_object(text):
+    """Parse the first balanced top-level JSON object in `text`.
+
+    Each candidate "{" is handed to the C JSON decoder, which parses the
+    common case (an object, possibly inside code fences or prose) in one
+    pass. If a candidate is not valid JSON (e.g. "{like this}" in prose), a
+    brace/string scanner skips to the end of its balanced span and the
+    search resumes there. Nothing past the last "}" can close a span and is
+    never scanned. Each character is looked at a bounded number of times,
+    and braces inside strings are never miscounted.
+    """
+    stop = text.rfind("}") + 1
+    pos = text.find("{", 0, stop)
+    while pos != -1:
+        try:
+            return _decoder.raw_decode(text, pos)[0]
+        except ValueError:
+            pass
+        end = _balanced_end(text, pos, stop)
+        if end is None:
+            break
+        pos = text.find("{", end, stop)
+
+    raise ReportError("No valid JSON object found.")
+
+
+def _require_list(data, key):
+    value = data.get(key)
+    if not isinstance(value, list):
+        raise ReportError(f"'{key}' must be a list.")
+    return value
+
+
+def _require_str(value, where):
+    if not isinstance(value, str):
+        raise ReportError(f"{where} must be a string.")
+    return value.strip()
+
+
+def _require_object(value, where):
+    if not isinstance(value, dict):
+        raise ReportError(f"{where} must be an object.")
+    return value
+
+
+@dataclass(frozen=True)
+class Item:
+    name: str
+    description: str
+
+
+@dataclass(frozen=True)
+class GreenerAlternative:
+    name: str
+    alternative: str
+
+
+@dataclass(frozen=True)
+class SustainabilityReport:
+    sustainability_score: float
+    items: List[Item]
+    greener_alternatives: List[GreenerAlternative]
+    temperature_regulation_suggestions: List[str]
+
+    @classmethod
+    def from_dict(cls, data):
+        """Validate a parsed model reply against the report structure; raises ReportError"""
+        _require_object(data, "Report")
+
+        score = data.get("sustainability_score")
+        if isinstance(score, str):
+            try:
+                score = float(score.strip())
+            except ValueError:
+                pass
+        if isinstance(score, bool) or not isinstance(score, numbers.Real):
+            raise ReportError("'sustainability_score' must be a number.")
+        if not 1 <= score <= 10:
+            raise ReportError("'sustainability_score' must be between 1 and 10.")
+        if float(score).is_integer():
+            score = int(score)
+
+        items = []
+        for i, item in enumerate(_require_list(data, "items")):
+            _require_object(item, f"items[{i}]")
+            items.append(Item(
+                _require_str(item.get("name"), f"items[{i}].name"),
+                _require_str(item.get("description"), f"items[{i}].description"),
+            ))
+
+        alternatives = []
+        for i, alt in enumerate(_require_list(data, "greener_alternatives")):
+            _require_object(alt, f"greener_alternatives[{i}]")
+            alternatives.append(GreenerAlternative(
+                _require_str(alt.get("name"), f"greener_alternatives[{i}].name"),
+                _require_str(alt.get("alternative"), f"greener_alternatives[{i}].alternative"),
+            ))
+
+        suggestions = [
+            _require_str(s, f"temperature_regulation_suggestions[{i}]")
+            for i, s in enumerate(_require_list(data, "temperature_regulation_suggestions"))
+        ]
+        return cls(score, items, alternatives, suggestions)
+
+    def to_dict(self):
+        # Hand-written rather than dataclasses.asdict, which deep-copies every field recursively
+        return {
+            "sustainability_score": self.sustainability_score,
+            "items": [{"name": i.name, "description": i.description} for i in self.items],
+            "greener_alternatives": [{"name": a.name, "alternative": a.alternative} for a in self.greener_alternatives],
+            "temperature_regulation_suggestions": list(self.temperature_regulation_suggestions),
+        }
+
+
+# Gemini responseSchema (OpenAPI subset) for SustainabilityReport, used in structured output mode
+RESPONSE_SCHEMA = {
+    "type": "OBJECT",
+    "properties": {
+        "sustainability_score": {"type": "NUMBER", "minimum": 1, "maximum": 10},
+        "items": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"name": {"type": "STRING"}, "description": {"type": "STRING"}},
+                "required": ["name", "description"],
+                "propertyOrdering": ["name", "description"],
+            },
+        },
+        "greener_alternatives": {
+            "type": "ARRAY",
+            "items": {
+                "type": "OBJECT",
+                "properties": {"name": {"type": "STRING"}, "alternative": {"type": "STRING"}},
+                "required": ["name", "alternative"],
+                "propertyOrdering": ["name", "alternative"],
+            },
+        },
+        "temperature_regulation_suggestions": {"type": "ARRAY", "items": {"type": "STRING"}},
+    },
+    "required": ["sustainability_score", "items", "greener_alternatives", "temperature_regulation_suggestions"],
+    "propertyOrdering": ["sustainability_score", "items", "greener_alternatives", "temperature_regulation_suggestions"],
+}
+
+STRUCTURED_GENERATION_CONFIG = {"responseMimeType": "application/json", "responseSchema": RESPONSE_SCHEMA}
+
+
+def validate_report(data):
+    """Check a parsed model reply against the report structure the prompt asks for; returns a cleaned copy"""
+    return SustainabilityReport.from_dict(data).to_dict()
+
+
+def parse_report(text):
+    """Extract and validate the report from raw model text"""
+    return validate_report(extract_json_object(text))
+
+
+def parse_structured_report(text):
+    """Parse a structured-output reply, which is the JSON document itself; no scanning needed"""
+    try:
+        data = json.loads(text)
+    except ValueError as e:
+        raise ReportError(f"Invalid JSON: {e}") from None
+    return SustainabilityReport.from_dict(data)
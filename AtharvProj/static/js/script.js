@@ -1,4 +1,5 @@
 const API_URL = "http://localhost:5000/api/identify"; 
+const MAX_UPLOAD_EDGE = 1536; // photos larger than this are downscaled before upload
 
 const $ = (q, ctx=document) => ctx.querySelector(q);
 const $$ = (q, ctx=document) => Array.from(ctx.querySelectorAll(q));
@@ -118,63 +119,130 @@ captureBtn.addEventListener("click", async ()=>{
   }, "image/jpeg", 0.92);
 });
 
-async function handleFiles(files){
-  // Clear previous results and hide the image
-  $("#sustainability-score").textContent = "Detecting...";
-  $("#items-list").innerHTML = "<li>Loading items...</li>";
-  $("#greener-alternatives-list").innerHTML = "<li>Loading greener alternatives...</li>";
-  $("#temp-reg-suggestions-list").innerHTML = "<li>Loading temperature regulation suggestions...</li>";
-  const originalImage = $("#original-image");
-  originalImage.src = "";
-  originalImage.style.display = "none";
-
-  if (files.length > 0) {
-    const reader = new FileReader();
-    reader.onload = (e) => {
-      originalImage.src = e.target.result;
-      originalImage.style.display = "block";
-    };
-    reader.readAsDataURL(files[0]); // Display the first image if multiple are uploaded
+// Downscale large photos in the browser so less data is uploaded; the server normalizes again
+async function downscaleImage(file){
+  if(!/^image\/(jpeg|png|webp)$/.test(file.type) || !window.createImageBitmap) return file;
+  let bitmap;
+  try{
+    bitmap = await createImageBitmap(file, { imageOrientation: "from-image" });
+  }catch(err){
+    return file;
   }
+  const scale = MAX_UPLOAD_EDGE / Math.max(bitmap.width, bitmap.height);
+  if(scale >= 1){ bitmap.close(); return file; }
+
+  const c = document.createElement("canvas");
+  c.width = Math.round(bitmap.width * scale);
+  c.height = Math.round(bitmap.height * scale);
+  c.getContext("2d").drawImage(bitmap, 0, 0, c.width, c.height);
+  bitmap.close();
+
+  const blob = await new Promise(resolve => c.toBlob(resolve, "image/jpeg", 0.85));
+  if(!blob || blob.size >= file.size) return file;
+  return new File([blob], file.name.replace(/\.\w+$/, "") + ".jpg", { type: "image/jpeg" });
+}
+
+async function handleFiles(files){
+  // Replace previous results with one pending card per image
+  const container = $("#image-results");
+  container.innerHTML = "";
+  const cards = files.map((file, i) => container.appendChild(createResultCard(file, i)));
+  enableTilt();
 
   try{
+    const uploads = await Promise.all(files.map(downscaleImage));
     const form = new FormData();
-    files.forEach(f => form.append("images", f, f.name));
+    uploads.forEach(f => form.append("images", f, f.name));
 
-    const res = await fetch(API_URL, { method:"POST", body: form });
+    const res = await fetch(`${API_URL}?stream=ndjson`, { method:"POST", body: form });
     if(!res.ok){
       const txt = await res.text();
       throw new Error(`Server error ${res.status}: ${txt}`);
     }
-    const data = await res.json();
-    if(!data.results) throw new Error("Malformed server response.");
 
-    fillCardResult(data.results[0]);
+    // Results arrive one per line as each image finishes; fill that image's card as soon as it lands
+    let count = 0;
+    for await (const result of readResults(res)){
+      count++;
+      if(cards[result.index]) fillCardResult(cards[result.index], result);
+      if(uploads.length > 1 && count < uploads.length) toast(`Analyzed ${count}/${uploads.length} images...`, "ok", 1500);
+    }
+    if(!count) throw new Error("Malformed server response.");
 
-    toast(`Analyzed ${data.results.length} image(s).`, "ok");
+    toast(`Analyzed ${count} image(s).`, "ok");
   }catch(err){
     console.error(err);
     toast(err.message || "Request failed.", "err");
-    // Clear loading messages on error
-    $("#sustainability-score").textContent = "Error";
-    $("#items-list").innerHTML = "<li>Error loading items.</li>";
-    $("#greener-alternatives-list").innerHTML = "<li>Error loading greener alternatives.</li>";
-    $("#temp-reg-suggestions-list").innerHTML = "<li>Error loading temperature regulation suggestions.</li>";
+    // Mark the cards that never got a result
+    cards
+      .filter(card => !card.classList.contains("ok") && !card.classList.contains("err"))
+      .forEach(card => fillCardResult(card, { error: err.message || "Request failed." }));
+  }
+}
+
+function createResultCard(file, index){
+  const card = el("div", "card result tilt");
+  card.dataset.tilt = "";
+  card.innerHTML = `
+    <div class="thumb"><img alt="Original Image"><span class="badge">#${index + 1}</span></div>
+    <div class="meta">
+      <h3></h3>
+      <p class="sustainability-score">Detecting...</p>
+    </div>
+    <div>
+      <h3>Items</h3>
+      <ul class="items-list"><li>Loading items...</li></ul>
+    </div>
+    <div>
+      <h3>Greener Alternatives</h3>
+      <ul class="greener-alternatives-list"><li>Loading greener alternatives...</li></ul>
+    </div>
+    <div>
+      <h3>Temperature Regulation Suggestions</h3>
+      <ul class="temp-reg-suggestions-list"><li>Loading temperature regulation suggestions...</li></ul>
+    </div>`;
+  $(".meta h3", card).textContent = file.name;
+  const img = $("img", card);
+  img.onload = () => URL.revokeObjectURL(img.src);
+  img.src = URL.createObjectURL(file);
+  return card;
+}
+
+// Parse a newline-delimited JSON response body, yielding each object as soon as its line is complete
+async function* readResults(res){
+  const reader = res.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = "";
+  while(true){
+    const { value, done } = await reader.read();
+    buffer += decoder.decode(value || new Uint8Array(), { stream: !done });
+    const lines = buffer.split("\n");
+    buffer = lines.pop();
+    for(const line of lines){
+      if(line.trim()) yield JSON.parse(line);
+    }
+    if(done) break;
   }
+  if(buffer.trim()) yield JSON.parse(buffer);
 }
 
-function fillCardResult(result){
-  const sustainabilityScore = $("#sustainability-score");
-  const itemsList = $("#items-list");
-  const greenerAlternativesList = $("#greener-alternatives-list");
-  const tempRegSuggestionsList = $("#temp-reg-suggestions-list");
+function fillCardResult(card, result){
+  const sustainabilityScore = $(".sustainability-score", card);
+  const itemsList = $(".items-list", card);
+  const greenerAlternativesList = $(".greener-alternatives-list", card);
+  const tempRegSuggestionsList = $(".temp-reg-suggestions-list", card);
 
   if(result.error){
+    card.classList.add("err");
     sustainabilityScore.textContent = "Error";
     itemsList.innerHTML = `<li>${result.error}</li>`;
+    greenerAlternativesList.innerHTML = "<li>Error loading greener alternatives.</li>";
+    tempRegSuggestionsList.innerHTML = "<li>Error loading temperature regulation suggestions.</li>";
     return;
   }
 
+  card.classList.add("ok");
+
   sustainabilityScore.textContent = result.sustainability_score || "Not available";
   
   itemsList.innerHTML = "";
@@ -0,0 +1,30 @@
+import time
+
+from ratelimit import FairExecutor
+
+
+def test_burst_on_idle_pool_runs_in_parallel():
+    executor = FairExecutor(max_workers=8, thread_name_prefix="test")
+    # Leave one idle thread behind, as after a previous upload
+    executor.submit("warmup", time.sleep, 0).result()
+    time.sleep(0.05)
+
+    start = time.monotonic()
+    futures = [executor.submit("burst", time.sleep, 0.5) for _ in range(8)]
+    for future in futures:
+        future.result()
+    elapsed = time.monotonic() - start
+
+    assert elapsed < 1.0, f"8 tasks of 0.5s took {elapsed:.2f}s"
+    assert executor.pending() == 0
+
+
+def test_later_client_is_served_before_earlier_backlog():
+    executor = FairExecutor(max_workers=1, thread_name_prefix="test")
+    order = []
+    big = [executor.submit("big", lambda i=i: (time.sleep(0.05), order.append(("big", i)))) for i in range(4)]
+    small = executor.submit("small", lambda: order.append(("small", 0)))
+    for future in big + [small]:
+        future.result()
+
+    assert order.index(("small", 0)) < 3
@@ -0,0 +1,4 @@
+"""WSGI entry point: gunicorn -c AtharvProj/gunicorn.conf.py"""
+from app import create_app
+
+app = create_app()
@@ -1,5 +1,5 @@
 import streamlit as st
-import matplotlib.pyplot as plt
+from matplotlib.figure import Figure
 import plotly.express as px
 import plotly.graph_objects as go
 import pandas as pd
@@ -8,6 +8,11 @@ import base64
 import io
 import numpy as np
 
+from materials import SORT_COLUMNS, MaterialCatalog, style_by_type
+from optimizer import default_costs, plan_improvements
+from scoring import (ALL_MASK, CATEGORY_QUESTION_IDS, QUESTION_TEXTS, category_percentages_bits,
+                     score_bits)
+
 st.set_page_config(
     page_title="Green Guardian",
     page_icon="🌱",
@@ -69,10 +74,9 @@ if 'current_page' not in st.session_state:
     st.session_state.current_page = "🏠 Home"
 if 'questionnaire_completed' not in st.session_state:
     st.session_state.questionnaire_completed = False
-if 'questionnaire_answers' not in st.session_state:
-    st.session_state.questionnaire_answers = {}
-if 'missed_items' not in st.session_state:
-    st.session_state.missed_items = []
+# Bit i is set when question i (see scoring.QUESTION_TEXTS) is answered "Yes"
+if 'answer_bits' not in st.session_state:
+    st.session_state.answer_bits = 0
 if 'total_score' not in st.session_state:
     st.session_state.total_score = 0
 if 'pledges_made' not in st.session_state:
@@ -103,84 +107,18 @@ def calculate_score():
     if not st.session_state.questionnaire_completed:
         return 0
 
-    questionnaire_data = get_questionnaire_data()
-
-    weights = {
-        "Energy Efficiency": 0.30,
-        "Water Conservation": 0.25,
-        "Waste Management": 0.25,
-        "Material Sustainability": 0.20
-    }
-
-    total_weighted_score = 0
-
-    for category, questions in questionnaire_data.items():
-        yes_count = sum(
-            1 for q in questions
-            if st.session_state.questionnaire_answers.get(q, False)
-        )
-
-        category_score = yes_count / len(questions)       
-        weighted_score = category_score * weights[category]
-
-        total_weighted_score += weighted_score
-
-    final_score = total_weighted_score * 100
-
-    
-    critical_questions = [
-        "Does your building use LED lighting throughout?",
-        "Is your building well-insulated (walls, attic, basement)?",
-        "Is there a rainwater harvesting system in place?",
-        "Is there a comprehensive recycling program?"
-    ]
-
-    penalty = 0
-    for cq in critical_questions:
-        if not st.session_state.questionnaire_answers.get(cq, False):
-            penalty += 5       
-
-    final_score -= penalty
-
-
-    final_score = max(0, min(100, round(final_score)))
+    final_score = score_bits(st.session_state.answer_bits)
 
     st.session_state.total_score = final_score
     return final_score
 
 
-def get_questionnaire_data():
-    """Get questionnaire questions organized by category"""
-    return {
-        "Energy Efficiency": [
-            "Does your building use LED lighting throughout?",
-            "Is your building well-insulated (walls, attic, basement)?",
-            "Do you have a programmable or smart thermostat?",
-            "Does your building use solar panels or renewable energy?",
-            "Are your windows energy-efficient (double/triple-pane)?"
-        ],
-        "Water Conservation": [
-            "Does your building have low-flow showerheads and faucets?",
-            "Do you use dual-flush or low-flow toilets?",
-            "Is there a rainwater harvesting system in place?",
-            "Does your landscaping use drought-resistant plants?",
-            "Are there systems in place to quickly detect and fix leaks?"
-        ],
-        "Waste Management": [
-            "Is there a comprehensive recycling program?",
-            "Do you compost organic waste?",
-            "Are there efforts to reduce packaging waste?",
-            "Do you donate or repurpose items instead of discarding?",
-            "Are reusable materials prioritized over single-use items?"
-        ],
-        "Material Sustainability": [
-            "Are building materials made from recycled content?",
-            "Do you use locally-sourced building materials?",
-            "Are low-VOC paints and finishes used throughout?",
-            "Is sustainable flooring (bamboo, cork, reclaimed wood) installed?",
-            "Are furniture and fixtures made from sustainable materials?"
-        ]
-    }
+CATEGORY_ICONS = {
+    "Energy Efficiency": "⚡",
+    "Water Conservation": "💧",
+    "Waste Management": "♻️",
+    "Material Sustainability": "🌿"
+}
 
 def get_score_category(score):
     """Get score category and emoji"""
@@ -268,31 +206,18 @@ def evaluation_page():
     </div>
     """, unsafe_allow_html=True)
 
-    questionnaire_data = get_questionnaire_data()
-
-    for category, questions in questionnaire_data.items():
-        for question in questions:
-            if question not in st.session_state.questionnaire_answers:
-                st.session_state.questionnaire_answers[question] = False
-
     col1, col2 = st.columns([2, 1])
 
     with col1:
 
-        missed_items = []
-
-        for category, questions in questionnaire_data.items():
+        answer_bits = st.session_state.answer_bits
 
-            icons = {
-                "Energy Efficiency": "⚡",
-                "Water Conservation": "💧", 
-                "Waste Management": "♻️",
-                "Material Sustainability": "🌿"
-            }
+        for category, question_ids in CATEGORY_QUESTION_IDS.items():
 
-            st.markdown(f"#### {icons[category]} {category}")
+            st.markdown(f"#### {CATEGORY_ICONS[category]} {category}")
 
-            for i, question in enumerate(questions):
+            for i, question_id in enumerate(question_ids):
+                question = QUESTION_TEXTS[question_id]
                 col_q1, col_q2 = st.columns([4, 1])
 
                 with col_q1:
@@ -303,24 +228,20 @@ def evaluation_page():
                     answer = st.radio(
                         "Answer",
                         ["No", "Yes"],
-                        index=1 if st.session_state.questionnaire_answers[question] else 0,
+                        index=(answer_bits >> question_id) & 1,
                         key=f"question_{category}_{i}",
                         horizontal=True,
                         label_visibility="collapsed"
                     )
 
-                    st.session_state.questionnaire_answers[question] = (answer == "Yes")
-
-                    if answer == "No":
-                        missed_items.append({
-                            "category": category,
-                            "question": question,
-                            "icon": icons[category]
-                        })
+                    if answer == "Yes":
+                        answer_bits |= 1 << question_id
+                    else:
+                        answer_bits &= ~(1 << question_id)
 
             st.markdown("---")
 
-        st.session_state.missed_items = missed_items
+        st.session_state.answer_bits = answer_bits
 
         st.session_state.questionnaire_completed = True
 
@@ -343,11 +264,7 @@ def evaluation_page():
 
         st.markdown("### 📋 Score Breakdown")
 
-        category_scores = {}
-        for cat, questions in questionnaire_data.items():
-            yes_count = sum(1 for q in questions if st.session_state.questionnaire_answers.get(q, False))
-            category_score = round((yes_count / len(questions)) * 100)
-            category_scores[cat] = category_score
+        for cat, category_score in category_percentages_bits(st.session_state.answer_bits).items():
             st.metric(cat, f"{category_score}%")
 
         st.markdown("### 📊 Visual Progress")
@@ -377,13 +294,13 @@ def evaluation_page():
         st.plotly_chart(fig, use_container_width=True)
 
         st.markdown("### 📈 Quick Stats")
-        questionnaire_data = get_questionnaire_data()
-        total_questions = sum(len(questions) for questions in questionnaire_data.values())
-        yes_answers = sum(1 for answer in st.session_state.questionnaire_answers.values() if answer)
+        total_questions = len(QUESTION_TEXTS)
+        yes_answers = st.session_state.answer_bits.bit_count()
 
         col_a, col_b = st.columns(2)
         with col_a:
-            st.metric("Questions Answered", f"{len(st.session_state.questionnaire_answers)}/{total_questions}")
+            # Every question starts out as "No", so all of them count as answered
+            st.metric("Questions Answered", f"{total_questions}/{total_questions}")
         with col_b:
             st.metric("Yes Answers", f"{yes_answers}/{total_questions}")
 
@@ -398,6 +315,48 @@ def evaluation_page():
             </div>
             """, unsafe_allow_html=True)
 
+def target_score_section(current_score, missed_bits, tips):
+    """Cheapest set of missed measures that reaches a chosen target score"""
+    st.markdown("### 🏁 Reach a Target Score")
+
+    if current_score < 99:
+        target = st.slider("Target score", min_value=current_score + 1, max_value=100,
+                           value=min(100, max(current_score + 1, 80)))
+    else:
+        target = 100
+
+    building_type = st.session_state.building_type
+    costs = default_costs(building_type)
+    missed_ids = [i for i in range(len(QUESTION_TEXTS)) if missed_bits >> i & 1]
+
+    with st.expander("💲 Adjust cost estimates"):
+        st.caption(f"Rough installed costs for a typical {building_type.lower()}; edit them to match your quotes.")
+        edited = st.data_editor(
+            pd.DataFrame({"Measure": [QUESTION_TEXTS[i] for i in missed_ids], "Cost ($)": costs[missed_ids]}),
+            disabled=["Measure"],
+            hide_index=True,
+            use_container_width=True,
+            key=f"measure_costs_{building_type}"
+        )
+        costs[missed_ids] = pd.to_numeric(edited["Cost ($)"], errors="coerce").fillna(0).clip(lower=0).to_numpy()
+
+    plan = plan_improvements(st.session_state.answer_bits, target, costs)
+    if plan is None:
+        st.warning(f"A score of {target}% is out of reach with the remaining measures.")
+        return
+
+    col1, col2, col3 = st.columns(3)
+    col1.metric("Estimated Cost", f"${plan.cost:,.0f}")
+    col2.metric("Resulting Score", f"{plan.score}%", delta=plan.score - current_score)
+    col3.metric("Measures", len(plan.question_ids))
+
+    for i in plan.question_ids:
+        question = QUESTION_TEXTS[i]
+        st.markdown(f"**{question}** (\\${costs[i]:,.0f})")
+        if question in tips:
+            st.markdown(f"💡 {tips[question]}")
+
+
 def tips_page():
     """Tips page with personalized recommendations based on questionnaire"""
     st.markdown('<h1 class="main-header">💡 Personalized Green Building Tips</h1>', unsafe_allow_html=True)
@@ -493,7 +452,8 @@ def tips_page():
         }
     }
 
-    if st.session_state.missed_items:
+    missed_bits = ALL_MASK & ~st.session_state.answer_bits
+    if missed_bits:
         st.markdown("### 🎯 Your Priority Improvement Areas")
         st.markdown("""
         <div class="tip-box">
@@ -501,22 +461,19 @@ def tips_page():
         </div>
         """, unsafe_allow_html=True)
 
-        missed_by_category = {}
-        for item in st.session_state.missed_items:
-            category = item['category']
-            if category not in missed_by_category:
-                missed_by_category[category] = []
-            missed_by_category[category].append(item)
-
-        for category, items in missed_by_category.items():
-            with st.expander(f"{items[0]['icon']} {category} - {len(items)} improvement opportunities", expanded=True):
-                for item in items:
-                    question = item['question']
+        for category, question_ids in CATEGORY_QUESTION_IDS.items():
+            missed = [QUESTION_TEXTS[i] for i in question_ids if missed_bits >> i & 1]
+            if not missed:
+                continue
+            with st.expander(f"{CATEGORY_ICONS[category]} {category} - {len(missed)} improvement opportunities", expanded=True):
+                for question in missed:
                     if question in question_tips[st.session_state.building_type]:
                         tip = question_tips[st.session_state.building_type][question]
                         st.markdown(f"**{question}**")
                         st.markdown(f"💡 {tip}")
                         st.markdown("---")
+
+        target_score_section(current_score, missed_bits, question_tips[st.session_state.building_type])
     else:
         st.markdown("""
         <div class="score-display">
@@ -571,6 +528,189 @@ def tips_page():
     for tip in general_tips:
         st.markdown(f"- {tip}")
 
+INFOGRAPHIC_CATEGORIES = ("Energy Efficiency", "Water Conservation", "Waste Management", "Material Sustainability")
+CHART_COLORS = ['#32CD32', '#90EE90', '#98FB98', '#00FF7F']
+
+# Charts depend only on the category scores, overall score and building type, so they are cached
+# on those (LRU-bounded, shared by all sessions). Cached Plotly figures are shared objects: never modify them.
+@st.cache_resource(max_entries=256, show_spinner=False)
+def build_infographic_figures(scores, current_score, building_type):
+    """Build the pie, bar, gauge and current-vs-target Plotly figures"""
+    categories = list(INFOGRAPHIC_CATEGORIES)
+    scores = list(scores)
+
+    fig_pie = px.pie(
+        values=scores,
+        names=categories,
+        title="Green Building Score Breakdown",
+        color_discrete_sequence=CHART_COLORS
+    )
+    fig_pie.update_layout(
+        font=dict(size=14),
+        title_font_size=16,
+        showlegend=True
+    )
+
+    fig_bar = px.bar(
+        x=categories,
+        y=scores,
+        title="Scores by Category",
+        labels={'x': 'Categories', 'y': 'Score (%)'},
+        color=scores,
+        color_continuous_scale='Greens'
+    )
+    fig_bar.update_layout(
+        font=dict(size=12),
+        title_font_size=16,
+        xaxis_tickangle=-45
+    )
+
+    fig_gauge = go.Figure(go.Indicator(
+        mode = "gauge+number+delta",
+        value = current_score,
+        domain = {'x': [0, 1], 'y': [0, 1]},
+        title = {'text': f"Overall Green Score<br><span style='font-size:0.8em'>Building Type: {building_type}</span>"},
+        delta = {'reference': 70, 'increasing': {'color': "RebeccaPurple"}},
+        gauge = {
+            'axis': {'range': [None, 100]},
+            'bar': {'color': "#32CD32"},
+            'steps': [
+                {'range': [0, 40], 'color': "#FFB6C1"},
+                {'range': [40, 60], 'color': "#FFFF99"},
+                {'range': [60, 80], 'color': "#98FB98"},
+                {'range': [80, 100], 'color': "#32CD32"}
+            ],
+            'threshold': {
+                'line': {'color': "red", 'width': 4},
+                'thickness': 0.75,
+                'value': 90
+            }
+        }
+    ))
+    fig_gauge.update_layout(height=400)
+
+    ideal_scores = [100, 100, 100, 100]
+
+    df_comparison = pd.DataFrame({
+        'Category': categories + categories,
+        'Score': scores + ideal_scores,
+        'Type': ['Current'] * 4 + ['Target'] * 4
+    })
+
+    fig_comparison = px.bar(
+        df_comparison,
+        x='Category',
+        y='Score',
+        color='Type',
+        title="Current vs Target Performance",
+        barmode='group',
+        color_discrete_map={'Current': '#32CD32', 'Target': '#90EE90'}
+    )
+    fig_comparison.update_layout(
+        font=dict(size=12),
+        title_font_size=16,
+        xaxis_tickangle=-45
+    )
+
+    return fig_pie, fig_bar, fig_gauge, fig_comparison
+
+def figure_to_png(fig):
+    """Render a Matplotlib figure to 300-dpi PNG bytes"""
+    img_buffer = io.BytesIO()
+    fig.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
+    return img_buffer.getvalue()
+
+# PNGs are drawn on standalone Figure objects rather than through pyplot, whose global
+# figure registry is not safe to use from several sessions' script threads at once
+@st.cache_data(max_entries=128, show_spinner=False)
+def render_bar_chart_png(scores, building_type):
+    """Render the downloadable bar chart"""
+    categories = list(INFOGRAPHIC_CATEGORIES)
+    fig = Figure(figsize=(10, 6))
+    ax = fig.subplots()
+    bars = ax.bar(categories, scores, color=CHART_COLORS)
+    ax.set_title(f'Green Building Scores - {building_type}', fontsize=16, fontweight='bold', color='#2E8B57')
+    ax.set_ylabel('Score (%)', fontsize=12)
+    ax.set_ylim(0, 100)
+    for label in ax.get_xticklabels():
+        label.set_rotation(45)
+        label.set_horizontalalignment('right')
+
+    for bar, score in zip(bars, scores):
+        height = bar.get_height()
+        ax.text(bar.get_x() + bar.get_width()/2., height + 1,
+               f'{score}%', ha='center', va='bottom', fontweight='bold')
+
+    fig.tight_layout()
+    return figure_to_png(fig)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def render_pie_chart_png(scores, building_type):
+    """Render the downloadable pie chart"""
+    fig = Figure(figsize=(8, 8))
+    ax = fig.subplots()
+    wedges, texts, autotexts = ax.pie(scores, labels=INFOGRAPHIC_CATEGORIES, autopct='%1.1f%%',
+                                    colors=CHART_COLORS, startangle=90)
+    ax.set_title(f'Green Building Score Distribution - {building_type}',
+                fontsize=16, fontweight='bold', color='#2E8B57', pad=20)
+
+    for autotext in autotexts:
+        autotext.set_color('white')
+        autotext.set_fontweight('bold')
+        autotext.set_fontsize(10)
+
+    fig.tight_layout()
+    return figure_to_png(fig)
+
+@st.cache_data(max_entries=128, show_spinner=False)
+def render_full_report_png(scores, current_score, building_type):
+    """Render the downloadable four-panel report"""
+    categories = list(INFOGRAPHIC_CATEGORIES)
+    fig = Figure(figsize=(15, 12))
+    ax1, ax2, ax3, ax4 = fig.subplots(2, 2).flat
+    fig.suptitle(f'Green Guardian Report - {building_type}', fontsize=20, fontweight='bold', color='#2E8B57')
+
+    ax1.pie(scores, labels=categories, autopct='%1.1f%%', colors=CHART_COLORS, startangle=90)
+    ax1.set_title('Score Distribution', fontsize=14, fontweight='bold')
+
+    bars = ax2.bar(categories, scores, color=CHART_COLORS)
+    ax2.set_title('Category Performance', fontsize=14, fontweight='bold')
+    ax2.set_ylabel('Score (%)')
+    ax2.set_ylim(0, 100)
+    ax2.tick_params(axis='x', rotation=45)
+
+    for bar, score in zip(bars, scores):
+        height = bar.get_height()
+        ax2.text(bar.get_x() + bar.get_width()/2., height + 1,
+                f'{score}%', ha='center', va='bottom', fontweight='bold')
+
+    angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
+    scores_radar = [score/100 for score in scores]
+    scores_radar += scores_radar[:1]
+    angles += angles[:1]
+
+    ax3.plot(angles, scores_radar, 'o-', linewidth=2, color='#32CD32')
+    ax3.fill(angles, scores_radar, alpha=0.25, color='#32CD32')
+    ax3.set_xticks(angles[:-1])
+    ax3.set_xticklabels([cat.replace(' ', '\n') for cat in categories])
+    ax3.set_ylim(0, 1)
+    ax3.set_title('Performance Radar', fontsize=14, fontweight='bold')
+    ax3.grid(True)
+
+    ax4.text(0.5, 0.6, f'{current_score}%', ha='center', va='center',
+            fontsize=48, fontweight='bold', color='#32CD32', transform=ax4.transAxes)
+    ax4.text(0.5, 0.4, 'Overall Green Score', ha='center', va='center',
+            fontsize=16, fontweight='bold', color='#2E8B57', transform=ax4.transAxes)
+    category, emoji = get_score_category(current_score)
+    ax4.text(0.5, 0.2, f'{category} {emoji}', ha='center', va='center',
+            fontsize=14, color='#228B22', transform=ax4.transAxes)
+    ax4.set_xlim(0, 1)
+    ax4.set_ylim(0, 1)
+    ax4.axis('off')
+
+    fig.tight_layout()
+    return figure_to_png(fig)
+
 def infographic_page():
     """Infographic page with charts and download functionality"""
     st.markdown('<h1 class="main-header">📈 Green Building Infographic</h1>', unsafe_allow_html=True)
@@ -590,105 +730,30 @@ def infographic_page():
             st.rerun()
         return
 
-    questionnaire_data = get_questionnaire_data()
-    categories = ["Energy Efficiency", "Water Conservation", "Waste Management", "Material Sustainability"]
-    scores = []
-
-    for category in categories:
-        questions = questionnaire_data[category]
-        yes_count = sum(1 for q in questions if st.session_state.questionnaire_answers.get(q, False))
-        category_score = round((yes_count / len(questions)) * 100)
-        scores.append(category_score)
+    percentages = category_percentages_bits(st.session_state.answer_bits)
+    scores = tuple(percentages[category] for category in INFOGRAPHIC_CATEGORIES)
+    building_type = st.session_state.building_type
+    fig_pie, fig_bar, fig_gauge, fig_comparison = build_infographic_figures(scores, current_score, building_type)
 
     col1, col2 = st.columns(2)
 
     with col1:
 
         st.markdown("### 🥧 Score Distribution")
-        fig_pie = px.pie(
-            values=scores,
-            names=categories,
-            title="Green Building Score Breakdown",
-            color_discrete_sequence=['#32CD32', '#90EE90', '#98FB98', '#00FF7F']
-        )
-        fig_pie.update_layout(
-            font=dict(size=14),
-            title_font_size=16,
-            showlegend=True
-        )
         st.plotly_chart(fig_pie, use_container_width=True)
 
     with col2:
 
         st.markdown("### 📊 Category Performance")
-        fig_bar = px.bar(
-            x=categories,
-            y=scores,
-            title="Scores by Category",
-            labels={'x': 'Categories', 'y': 'Score (%)'},
-            color=scores,
-            color_continuous_scale='Greens'
-        )
-        fig_bar.update_layout(
-            font=dict(size=12),
-            title_font_size=16,
-            xaxis_tickangle=-45
-        )
         st.plotly_chart(fig_bar, use_container_width=True)
 
     st.markdown("### 🎯 Overall Performance")
 
     col1, col2, col3 = st.columns([1, 2, 1])
     with col2:
-        fig_gauge = go.Figure(go.Indicator(
-            mode = "gauge+number+delta",
-            value = current_score,
-            domain = {'x': [0, 1], 'y': [0, 1]},
-            title = {'text': f"Overall Green Score<br><span style='font-size:0.8em'>Building Type: {st.session_state.building_type}</span>"},
-            delta = {'reference': 70, 'increasing': {'color': "RebeccaPurple"}},
-            gauge = {
-                'axis': {'range': [None, 100]},
-                'bar': {'color': "#32CD32"},
-                'steps': [
-                    {'range': [0, 40], 'color': "#FFB6C1"},
-                    {'range': [40, 60], 'color': "#FFFF99"},
-                    {'range': [60, 80], 'color': "#98FB98"},
-                    {'range': [80, 100], 'color': "#32CD32"}
-                ],
-                'threshold': {
-                    'line': {'color': "red", 'width': 4},
-                    'thickness': 0.75,
-                    'value': 90
-                }
-            }
-        ))
-        fig_gauge.update_layout(height=400)
         st.plotly_chart(fig_gauge, use_container_width=True)
 
     st.markdown("### 📈 Improvement Potential")
-
-    ideal_scores = [100, 100, 100, 100]
-
-    df_comparison = pd.DataFrame({
-        'Category': categories + categories,
-        'Score': scores + ideal_scores,
-        'Type': ['Current'] * 4 + ['Target'] * 4
-    })
-
-    fig_comparison = px.bar(
-        df_comparison,
-        x='Category',
-        y='Score',
-        color='Type',
-        title="Current vs Target Performance",
-        barmode='group',
-        color_discrete_map={'Current': '#32CD32', 'Target': '#90EE90'}
-    )
-    fig_comparison.update_layout(
-        font=dict(size=12),
-        title_font_size=16,
-        xaxis_tickangle=-45
-    )
     st.plotly_chart(fig_comparison, use_container_width=True)
 
     st.markdown("---")
@@ -696,127 +761,118 @@ def infographic_page():
 
     col1, col2, col3 = st.columns(3)
 
-    def create_matplotlib_chart():
-        """Create a comprehensive matplotlib chart for download"""
-        fig, ((ax1, ax2), (ax3, ax4)) = plt.subplots(2, 2, figsize=(15, 12))
-        fig.suptitle(f'Green Guardian Report - {st.session_state.building_type}', fontsize=20, fontweight='bold', color='#2E8B57')
-
-        colors = ['#32CD32', '#90EE90', '#98FB98', '#00FF7F']
-        ax1.pie(scores, labels=categories, autopct='%1.1f%%', colors=colors, startangle=90)
-        ax1.set_title('Score Distribution', fontsize=14, fontweight='bold')
-
-        bars = ax2.bar(categories, scores, color=colors)
-        ax2.set_title('Category Performance', fontsize=14, fontweight='bold')
-        ax2.set_ylabel('Score (%)')
-        ax2.set_ylim(0, 100)
-        ax2.tick_params(axis='x', rotation=45)
-
-        for bar, score in zip(bars, scores):
-            height = bar.get_height()
-            ax2.text(bar.get_x() + bar.get_width()/2., height + 1,
-                    f'{score}%', ha='center', va='bottom', fontweight='bold')
-
-        angles = np.linspace(0, 2 * np.pi, len(categories), endpoint=False).tolist()
-        scores_radar = [score/100 for score in scores]  
-        scores_radar += scores_radar[:1]  
-        angles += angles[:1]
-
-        ax3.plot(angles, scores_radar, 'o-', linewidth=2, color='#32CD32')
-        ax3.fill(angles, scores_radar, alpha=0.25, color='#32CD32')
-        ax3.set_xticks(angles[:-1])
-        ax3.set_xticklabels([cat.replace(' ', '\n') for cat in categories])
-        ax3.set_ylim(0, 1)
-        ax3.set_title('Performance Radar', fontsize=14, fontweight='bold')
-        ax3.grid(True)
-
-        ax4.text(0.5, 0.6, f'{current_score}%', ha='center', va='center', 
-                fontsize=48, fontweight='bold', color='#32CD32', transform=ax4.transAxes)
-        ax4.text(0.5, 0.4, 'Overall Green Score', ha='center', va='center', 
-                fontsize=16, fontweight='bold', color='#2E8B57', transform=ax4.transAxes)
-        category, emoji = get_score_category(current_score)
-        ax4.text(0.5, 0.2, f'{category} {emoji}', ha='center', va='center', 
-                fontsize=14, color='#228B22', transform=ax4.transAxes)
-        ax4.set_xlim(0, 1)
-        ax4.set_ylim(0, 1)
-        ax4.axis('off')
-
-        plt.tight_layout()
-        return fig
-
     with col1:
         if st.button("📊 Download Bar Chart", use_container_width=True):
-
-            fig, ax = plt.subplots(figsize=(10, 6))
-            bars = ax.bar(categories, scores, color=['#32CD32', '#90EE90', '#98FB98', '#00FF7F'])
-            ax.set_title(f'Green Building Scores - {st.session_state.building_type}', fontsize=16, fontweight='bold', color='#2E8B57')
-            ax.set_ylabel('Score (%)', fontsize=12)
-            ax.set_ylim(0, 100)
-            plt.xticks(rotation=45, ha='right')
-
-            for bar, score in zip(bars, scores):
-                height = bar.get_height()
-                ax.text(bar.get_x() + bar.get_width()/2., height + 1,
-                       f'{score}%', ha='center', va='bottom', fontweight='bold')
-
-            plt.tight_layout()
-
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-
             st.download_button(
                 label="💾 Download Bar Chart PNG",
-                data=img_buffer.getvalue(),
-                file_name=f"green_guardian_bar_chart_{st.session_state.building_type.lower()}.png",
+                data=render_bar_chart_png(scores, building_type),
+                file_name=f"green_guardian_bar_chart_{building_type.lower()}.png",
                 mime="image/png"
             )
-            plt.close()
 
     with col2:
         if st.button("🥧 Download Pie Chart", use_container_width=True):
-
-            fig, ax = plt.subplots(figsize=(8, 8))
-            colors = ['#32CD32', '#90EE90', '#98FB98', '#00FF7F']
-            wedges, texts, autotexts = ax.pie(scores, labels=categories, autopct='%1.1f%%', 
-                                            colors=colors, startangle=90)
-            ax.set_title(f'Green Building Score Distribution - {st.session_state.building_type}', 
-                        fontsize=16, fontweight='bold', color='#2E8B57', pad=20)
-
-            for autotext in autotexts:
-                autotext.set_color('white')
-                autotext.set_fontweight('bold')
-                autotext.set_fontsize(10)
-
-            plt.tight_layout()
-
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-
             st.download_button(
                 label="💾 Download Pie Chart PNG",
-                data=img_buffer.getvalue(),
-                file_name=f"green_guardian_pie_chart_{st.session_state.building_type.lower()}.png",
+                data=render_pie_chart_png(scores, building_type),
+                file_name=f"green_guardian_pie_chart_{building_type.lower()}.png",
                 mime="image/png"
             )
-            plt.close()
 
     with col3:
         if st.button("📈 Download Full Report", use_container_width=True):
-
-            fig = create_matplotlib_chart()
-
-            img_buffer = io.BytesIO()
-            plt.savefig(img_buffer, format='png', dpi=300, bbox_inches='tight')
-            img_buffer.seek(0)
-
             st.download_button(
                 label="💾 Download Full Report PNG",
-                data=img_buffer.getvalue(),
-                file_name=f"green_guardian_full_report_{st.session_state.building_type.lower()}.png",
+                data=render_full_report_png(scores, current_score, building_type),
+                file_name=f"green_guardian_full_report_{building_type.lower()}.png",
                 mime="image/png"
             )
-            plt.close()
+
+TYPE_COLORS = {'Eco-Friendly': '#32CD32', 'Conventional': '#FF6B6B'}
+# Per-material charts are capped so a large catalog stays responsive in the browser
+MAX_BARS_PER_TYPE = 15
+MAX_SCATTER_POINTS = 2000
+
+
+@st.cache_resource(show_spinner="Loading material catalog...")
+def get_material_catalog():
+    """Material catalog, loaded once per process and shared by every session"""
+    return MaterialCatalog.load()
+
+
+@st.cache_resource(show_spinner=False)
+def build_material_figures():
+    """Material charts; they depend only on the catalog, so every session reuses them"""
+    catalog = get_material_catalog()
+    colors = {t: TYPE_COLORS.get(t) for t in catalog.types}
+
+    fig_co2 = go.Figure()
+    for material_type in catalog.types:
+        rows = catalog.of_type(material_type, MAX_BARS_PER_TYPE)
+        fig_co2.add_trace(go.Bar(
+            name=material_type,
+            x=rows['Material'],
+            y=rows['CO2 Emissions (kg/m²)'],
+            marker_color=colors[material_type]
+        ))
+
+    fig_co2.update_layout(
+        title='CO2 Emissions by Material Type',
+        xaxis_title='Materials',
+        yaxis_title='CO2 Emissions (kg/m²)',
+        barmode='group',
+        xaxis_tickangle=-45
+    )
+
+    means = catalog.means.reset_index()
+    fig_avg = px.pie(
+        means,
+        values='CO2 Emissions (kg/m²)',
+        names='Type',
+        title='Average CO2 Emissions by Type',
+        color='Type',
+        color_discrete_map=colors
+    )
+
+    fig_scatter = px.scatter(
+        catalog.sample(MAX_SCATTER_POINTS),
+        x='Cost ($/m²)',
+        y='Sustainability Score',
+        color='Type',
+        size='Durability (years)',
+        hover_data=['Material'],
+        title='Cost vs Sustainability Score',
+        color_discrete_map=colors
+    )
+
+    fig_cost = px.bar(
+        means,
+        x='Type',
+        y='Cost ($/m²)',
+        title='Average Cost by Material Type',
+        color='Type',
+        color_discrete_map=colors
+    )
+
+    # Box statistics come from the catalog's precomputed quartiles instead of every row
+    durability = catalog.quartiles['Durability (years)']
+    fig_durability = go.Figure()
+    for material_type in catalog.types:
+        low, q1, median, q3, high = durability.loc[material_type]
+        fig_durability.add_trace(go.Box(
+            name=material_type,
+            x=[material_type],
+            lowerfence=[low], q1=[q1], median=[median], q3=[q3], upperfence=[high],
+            marker_color=colors[material_type]
+        ))
+    fig_durability.update_layout(
+        title='Durability Distribution by Material Type',
+        xaxis_title='Type',
+        yaxis_title='Durability (years)'
+    )
+
+    return fig_co2, fig_avg, fig_scatter, fig_cost, fig_durability
+
 
 def material_comparison_page():
     """Material comparison page with educational content"""
@@ -828,73 +884,42 @@ def material_comparison_page():
     </div>
     """, unsafe_allow_html=True)
 
-    materials_data = {
-        'Material': [
-            'Bamboo Flooring', 'Hardwood Flooring', 'Recycled Steel', 'Conventional Steel',
-            'Reclaimed Wood', 'New Lumber', 'Cork Flooring', 'Vinyl Flooring',
-            'Hemp Insulation', 'Fiberglass Insulation', 'Solar Panels', 'Coal Energy',
-            'Low-VOC Paint', 'Standard Paint', 'Recycled Concrete', 'New Concrete',
-            'Living Roof', 'Asphalt Shingles', 'Triple-Pane Windows', 'Single-Pane Windows'
-        ],
-        'Type': [
-            'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
-            'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
-            'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
-            'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
-            'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional'
-        ],
-        'CO2 Emissions (kg/m²)': [
-            5, 15, 8, 25, 3, 12, 7, 35, 2, 18, 45, 820, 1, 8, 15, 35, 20, 45, 25, 55
-        ],
-        'Cost ($/m²)': [
-            45, 60, 85, 65, 55, 40, 50, 25, 8, 5, 200, 50, 35, 25, 45, 30, 150, 80, 120, 40
-        ],
-        'Durability (years)': [
-            25, 30, 100, 50, 50, 20, 40, 15, 50, 25, 25, 0, 10, 8, 75, 50, 50, 20, 40, 15
-        ],
-        'Sustainability Score': [
-            9, 6, 8, 4, 9, 5, 8, 3, 9, 4, 10, 1, 8, 4, 7, 5, 9, 4, 8, 3
-        ]
-    }
-
-    df = pd.DataFrame(materials_data)
+    catalog = get_material_catalog()
 
     st.markdown("### 🎛️ Filter Materials")
-    col1, col2 = st.columns(2)
+    col1, col2, col3 = st.columns([2, 2, 1])
 
     with col1:
         material_type_filter = st.selectbox(
             "Filter by Type:",
-            ["All", "Eco-Friendly", "Conventional"]
+            ["All"] + catalog.types
         )
 
     with col2:
         sort_by = st.selectbox(
             "Sort by:",
-            ["Material", "CO2 Emissions (kg/m²)", "Cost ($/m²)", "Durability (years)", "Sustainability Score"]
+            list(SORT_COLUMNS)
         )
 
-    if material_type_filter != "All":
-        df_filtered = df[df['Type'] == material_type_filter].copy()
-    else:
-        df_filtered = df.copy()
-
-    ascending = sort_by not in ["Durability (years)", "Sustainability Score"]
-    df_filtered = df_filtered.sort_values(by=sort_by, ascending=ascending)
+    with col3:
+        page_size = st.selectbox("Rows per page:", [50, 100, 250])
 
-    st.markdown("### 📊 Material Comparison Table")
+    total_rows = len(catalog.rows(material_type_filter, sort_by))
+    page_count = max(1, -(-total_rows // page_size))
+    page = 1
+    if page_count > 1:
+        page = st.number_input(f"Page (of {page_count}):", min_value=1, max_value=page_count, value=1, step=1)
 
-    def style_dataframe(df):
-        def highlight_eco_friendly(row):
-            if row['Type'] == 'Eco-Friendly':
-                return ['background-color: #E6FFE6'] * len(row)
-            else:
-                return ['background-color: #FFE6E6'] * len(row)
+    df_page, total_rows = catalog.page(material_type_filter, sort_by, page, page_size)
 
-        return df.style.apply(highlight_eco_friendly, axis=1)
+    st.markdown("### 📊 Material Comparison Table")
 
-    styled_df = style_dataframe(df_filtered)
+    styled_df = df_page.style.apply(style_by_type, axis=None)
     st.dataframe(styled_df, use_container_width=True, hide_index=True)
+    if page_count > 1:
+        st.caption(f"Showing {len(df_page)} of {total_rows} materials")
+
+    fig_co2, fig_avg, fig_scatter, fig_cost, fig_durability = build_material_figures()
 
     st.markdown("---")
     st.markdown("### 📈 Material Performance Analysis")
@@ -905,97 +930,36 @@ def material_comparison_page():
         col1, col2 = st.columns(2)
 
         with col1:
-
-            eco_friendly = df[df['Type'] == 'Eco-Friendly']
-            conventional = df[df['Type'] == 'Conventional']
-
-            fig_co2 = go.Figure()
-            fig_co2.add_trace(go.Bar(
-                name='Eco-Friendly',
-                x=eco_friendly['Material'],
-                y=eco_friendly['CO2 Emissions (kg/m²)'],
-                marker_color='#32CD32'
-            ))
-            fig_co2.add_trace(go.Bar(
-                name='Conventional',
-                x=conventional['Material'],
-                y=conventional['CO2 Emissions (kg/m²)'],
-                marker_color='#FF6B6B'
-            ))
-
-            fig_co2.update_layout(
-                title='CO2 Emissions by Material Type',
-                xaxis_title='Materials',
-                yaxis_title='CO2 Emissions (kg/m²)',
-                barmode='group',
-                xaxis_tickangle=-45
-            )
             st.plotly_chart(fig_co2, use_container_width=True)
 
         with col2:
-
-            avg_emissions = df.groupby('Type')['CO2 Emissions (kg/m²)'].mean().reset_index()
-
-            fig_avg = px.pie(
-                avg_emissions,
-                values='CO2 Emissions (kg/m²)',
-                names='Type',
-                title='Average CO2 Emissions by Type',
-                color_discrete_map={'Eco-Friendly': '#32CD32', 'Conventional': '#FF6B6B'}
-            )
             st.plotly_chart(fig_avg, use_container_width=True)
 
     with tab2:
         col1, col2 = st.columns(2)
 
         with col1:
-
-            fig_scatter = px.scatter(
-                df,
-                x='Cost ($/m²)',
-                y='Sustainability Score',
-                color='Type',
-                size='Durability (years)',
-                hover_data=['Material'],
-                title='Cost vs Sustainability Score',
-                color_discrete_map={'Eco-Friendly': '#32CD32', 'Conventional': '#FF6B6B'}
-            )
             st.plotly_chart(fig_scatter, use_container_width=True)
 
         with col2:
-
-            avg_cost = df.groupby('Type')['Cost ($/m²)'].mean().reset_index()
-
-            fig_cost = px.bar(
-                avg_cost,
-                x='Type',
-                y='Cost ($/m²)',
-                title='Average Cost by Material Type',
-                color='Type',
-                color_discrete_map={'Eco-Friendly': '#32CD32', 'Conventional': '#FF6B6B'}
-            )
             st.plotly_chart(fig_cost, use_container_width=True)
 
     with tab3:
-
-        fig_durability = px.box(
-            df,
-            x='Type',
-            y='Durability (years)',
-            title='Durability Distribution by Material Type',
-            color='Type',
-            color_discrete_map={'Eco-Friendly': '#32CD32', 'Conventional': '#FF6B6B'}
-        )
         st.plotly_chart(fig_durability, use_container_width=True)
 
+    if not {'Eco-Friendly', 'Conventional'} <= set(catalog.types):
+        return
+
+    means = catalog.means
+
     st.markdown("---")
     st.markdown("### 🔍 Key Insights")
 
     col1, col2, col3 = st.columns(3)
 
     with col1:
-        eco_avg_co2 = df[df['Type'] == 'Eco-Friendly']['CO2 Emissions (kg/m²)'].mean()
-        conv_avg_co2 = df[df['Type'] == 'Conventional']['CO2 Emissions (kg/m²)'].mean()
+        eco_avg_co2 = means.loc['Eco-Friendly', 'CO2 Emissions (kg/m²)']
+        conv_avg_co2 = means.loc['Conventional', 'CO2 Emissions (kg/m²)']
         reduction = ((conv_avg_co2 - eco_avg_co2) / conv_avg_co2) * 100
 
         st.markdown(f"""
@@ -1006,8 +970,8 @@ def material_comparison_page():
         """, unsafe_allow_html=True)
 
     with col2:
-        eco_avg_durability = df[df['Type'] == 'Eco-Friendly']['Durability (years)'].mean()
-        conv_avg_durability = df[df['Type'] == 'Conventional']['Durability (years)'].mean()
+        eco_avg_durability = means.loc['Eco-Friendly', 'Durability (years)']
+        conv_avg_durability = means.loc['Conventional', 'Durability (years)']
         durability_improvement = eco_avg_durability - conv_avg_durability
 
         st.markdown(f"""
@@ -1018,8 +982,8 @@ def material_comparison_page():
         """, unsafe_allow_html=True)
 
     with col3:
-        eco_avg_sustainability = df[df['Type'] == 'Eco-Friendly']['Sustainability Score'].mean()
-        conv_avg_sustainability = df[df['Type'] == 'Conventional']['Sustainability Score'].mean()
+        eco_avg_sustainability = means.loc['Eco-Friendly', 'Sustainability Score']
+        conv_avg_sustainability = means.loc['Conventional', 'Sustainability Score']
 
         st.markdown(f"""
         <div class="tip-box">
@@ -0,0 +1,133 @@
+"""Building material catalog behind the material comparison page.
+
+The catalog is loaded once from the Parquet or CSV file named by
+GREENGUARDIAN_MATERIALS (Parquet is memory-mapped), or from the built-in
+sample below when that is unset. It needs the columns in COLUMNS, with
+Type usually "Eco-Friendly" or "Conventional". Sort orders, the row
+index of each Type and the per-Type aggregates are computed at load, so
+filtering, sorting and paging only slice precomputed arrays.
+"""
+import os
+
+import numpy as np
+import pandas as pd
+
+CATALOG_PATH = os.getenv('GREENGUARDIAN_MATERIALS')
+
+COLUMNS = ("Material", "Type", "CO2 Emissions (kg/m²)", "Cost ($/m²)", "Durability (years)", "Sustainability Score")
+NUMERIC_COLUMNS = COLUMNS[2:]
+SORT_COLUMNS = ("Material",) + NUMERIC_COLUMNS
+# Higher is better for these, so they sort largest first
+DESCENDING_COLUMNS = frozenset({"Durability (years)", "Sustainability Score"})
+
+DEFAULT_MATERIALS = {
+    'Material': [
+        'Bamboo Flooring', 'Hardwood Flooring', 'Recycled Steel', 'Conventional Steel',
+        'Reclaimed Wood', 'New Lumber', 'Cork Flooring', 'Vinyl Flooring',
+        'Hemp Insulation', 'Fiberglass Insulation', 'Solar Panels', 'Coal Energy',
+        'Low-VOC Paint', 'Standard Paint', 'Recycled Concrete', 'New Concrete',
+        'Living Roof', 'Asphalt Shingles', 'Triple-Pane Windows', 'Single-Pane Windows'
+    ],
+    'Type': [
+        'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
+        'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
+        'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
+        'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional',
+        'Eco-Friendly', 'Conventional', 'Eco-Friendly', 'Conventional'
+    ],
+    'CO2 Emissions (kg/m²)': [
+        5, 15, 8, 25, 3, 12, 7, 35, 2, 18, 45, 820, 1, 8, 15, 35, 20, 45, 25, 55
+    ],
+    'Cost ($/m²)': [
+        45, 60, 85, 65, 55, 40, 50, 25, 8, 5, 200, 50, 35, 25, 45, 30, 150, 80, 120, 40
+    ],
+    'Durability (years)': [
+        25, 30, 100, 50, 50, 20, 40, 15, 50, 25, 25, 0, 10, 8, 75, 50, 50, 20, 40, 15
+    ],
+    'Sustainability Score': [
+        9, 6, 8, 4, 9, 5, 8, 3, 9, 4, 10, 1, 8, 4, 7, 5, 9, 4, 8, 3
+    ]
+}
+
+
+class MaterialCatalog:
+    """Read-only, column-oriented material table with precomputed sort orders and Type index"""
+
+    def __init__(self, df):
+        missing = [c for c in COLUMNS if c not in df.columns]
+        if missing:
+            raise ValueError(f"Material catalog is missing columns: {', '.join(missing)}")
+
+        df = df.loc[:, list(COLUMNS)].reset_index(drop=True)
+        df["Material"] = df["Material"].astype(str)
+        # Types in order of first appearance, stored as a categorical
+        self.types = df["Type"].dropna().astype(str).drop_duplicates().tolist()
+        df["Type"] = pd.Categorical(df["Type"], categories=self.types)
+        for column in NUMERIC_COLUMNS:
+            df[column] = pd.to_numeric(df[column], errors="coerce")
+        self.df = df
+
+        # Stable row orders per sort column; missing values go last either way
+        self._orders = {}
+        for column in SORT_COLUMNS:
+            values = df[column].to_numpy()
+            if column in DESCENDING_COLUMNS:
+                values = -values
+            self._orders[column] = np.argsort(values, kind="stable")
+
+        codes = df["Type"].cat.codes.to_numpy()
+        self._type_masks = {t: codes == i for i, t in enumerate(self.types)}
+        self._views = {}
+
+        grouped = df.groupby("Type", observed=True)[list(NUMERIC_COLUMNS)]
+        self.means = grouped.mean()
+        self.quartiles = grouped.quantile([0.0, 0.25, 0.5, 0.75, 1.0]).unstack()
+
+    @classmethod
+    def from_file(cls, path):
+        if path.endswith(".parquet"):
+            return cls(pd.read_parquet(path, columns=list(COLUMNS), memory_map=True))
+        return cls(pd.read_csv(path, usecols=list(COLUMNS), memory_map=True))
+
+    @classmethod
+    def load(cls, path=CATALOG_PATH):
+        """The catalog at `path`, or the built-in sample when no path is given"""
+        if path:
+            return cls.from_file(path)
+        return cls(pd.DataFrame(DEFAULT_MATERIALS))
+
+    def __len__(self):
+        return len(self.df)
+
+    def rows(self, type_filter="All", sort_by="Material"):
+        """Row positions matching `type_filter`, in `sort_by` order; cached per combination"""
+        key = (type_filter, sort_by)
+        if key not in self._views:
+            order = self._orders[sort_by]
+            if type_filter != "All":
+                order = order[self._type_masks[type_filter][order]]
+            self._views[key] = order
+        return self._views[key]
+
+    def page(self, type_filter="All", sort_by="Material", page=1, page_size=50):
+        """One page of the filtered, sorted table plus the total number of matching rows"""
+        rows = self.rows(type_filter, sort_by)
+        start = (page - 1) * page_size
+        return self.df.take(rows[start:start + page_size]), len(rows)
+
+    def of_type(self, material_type, limit=None):
+        """Rows of one Type in catalog order, at most `limit` of them"""
+        positions = np.flatnonzero(self._type_masks[material_type])
+        return self.df.take(positions[:limit])
+
+    def sample(self, limit, seed=0):
+        """The whole table if it has at most `limit` rows, otherwise a fixed random sample of that size"""
+        if len(self.df) <= limit:
+            return self.df
+        return self.df.sample(limit, random_state=seed).sort_index()
+
+
+def style_by_type(df):
+    """Row background by Type, computed for the whole frame at once (for Styler.apply with axis=None)"""
+    colors = np.where(df["Type"].to_numpy() == "Eco-Friendly", "background-color: #E6FFE6", "background-color: #FFE6E6")
+    return pd.DataFrame(np.repeat(colors[:, None], df.shape[1], axis=1), index=df.index, columns=df.columns)
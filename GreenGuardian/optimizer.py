@@ -0,0 +1,200 @@
+"""Cheapest set of improvements that lifts a building to a target green score.
+
+Usage (from the repository root):
+
+    python GreenGuardian/optimizer.py portfolio.csv --target 70 -o plans.csv
+    python GreenGuardian/optimizer.py portfolio.parquet --target 80 --costs costs.csv --building-type Office
+
+The portfolio uses the same layout as scoring.py. A costs file has
+`question` (short key from scoring.QUESTIONS) and `cost` columns and
+overrides DEFAULT_COSTS for the questions it lists.
+
+Under the scoring rules every "Yes" is worth a whole number of points:
+its category weight spread over the category's questions (6, 5, 5 and 4),
+plus the critical-question penalty it avoids. The score is the clamped
+sum of those points minus the penalty for every critical question, so
+reaching a target is a min-cost covering knapsack over at most 120 points.
+It is solved exactly by dynamic programming over points, vectorized across
+buildings, with the chosen measures recovered by backtracking.
+"""
+import argparse
+import os
+import sys
+from typing import NamedTuple, Tuple
+
+import numpy as np
+
+from scoring import (CATEGORY_QUESTION_IDS, CATEGORY_WEIGHTS, CRITICAL_MASK, CRITICAL_PENALTY, QUESTIONS,
+                     answer_matrix, read_table, write_table)
+
+# Rough installed cost in dollars of turning each "No" into a "Yes" for a typical home
+DEFAULT_COSTS = {
+    "led_lighting": 300,
+    "insulation": 4000,
+    "smart_thermostat": 250,
+    "renewable_energy": 15000,
+    "efficient_windows": 9000,
+    "low_flow_fixtures": 150,
+    "efficient_toilets": 600,
+    "rainwater_harvesting": 1500,
+    "drought_resistant_landscaping": 2500,
+    "leak_detection": 400,
+    "recycling_program": 100,
+    "composting": 150,
+    "packaging_reduction": 50,
+    "donate_repurpose": 0,
+    "reusables": 100,
+    "recycled_materials": 5000,
+    "local_materials": 3000,
+    "low_voc_finishes": 800,
+    "sustainable_flooring": 4500,
+    "sustainable_furniture": 2500,
+}
+# Multiplier on DEFAULT_COSTS for larger buildings
+BUILDING_COST_SCALE = {"Home": 1, "Office": 5, "School": 8}
+
+
+def _question_points():
+    points = np.zeros(len(QUESTIONS), dtype=np.int64)
+    for category, ids in CATEGORY_QUESTION_IDS.items():
+        share = CATEGORY_WEIGHTS[category] * 100 / len(ids)
+        if abs(share - round(share)) > 1e-9:
+            raise ValueError(f"'{category}' questions are not worth a whole number of points ({share})")
+        points[list(ids)] = round(share)
+    critical = [(CRITICAL_MASK >> i) & 1 for i in range(len(QUESTIONS))]
+    return points + CRITICAL_PENALTY * np.array(critical, dtype=np.int64)
+
+
+# Points gained by answering each question "Yes"; the unclamped score is their sum minus BASE_PENALTY
+QUESTION_POINTS = _question_points()
+BASE_PENALTY = CRITICAL_PENALTY * CRITICAL_MASK.bit_count()
+MAX_POINTS = int(QUESTION_POINTS.sum())
+
+
+class Plan(NamedTuple):
+    question_ids: Tuple[int, ...]
+    cost: float
+    score: int
+
+
+def default_costs(building_type="Home"):
+    """DEFAULT_COSTS in QUESTIONS order, scaled for the building type"""
+    scale = BUILDING_COST_SCALE.get(building_type, 1)
+    return np.array([DEFAULT_COSTS[key] * scale for key, _, _ in QUESTIONS], dtype=float)
+
+
+def scores_from_matrix(matrix):
+    """Green scores of an (n_buildings, n_questions) boolean matrix, via the integer points"""
+    return np.clip(np.asarray(matrix, dtype=bool) @ QUESTION_POINTS - BASE_PENALTY, 0, 100)
+
+
+def plan_portfolio(matrix, target, costs=None, chunk_size=10000):
+    """Cheapest measures that bring every building to at least `target`.
+
+    `matrix` is an (n_buildings, n_questions) boolean answer matrix in QUESTIONS
+    order. `costs` gives the cost of each measure, either per question (shape
+    (n_questions,)) or per building and question; defaults to default_costs().
+    Returns (measures as a boolean matrix of the "No" answers to turn into
+    "Yes", total cost per building, resulting score per building). Buildings
+    that cannot reach the target even with every measure get cost inf and no
+    measures.
+    """
+    matrix = np.atleast_2d(np.asarray(matrix, dtype=bool))
+    costs = default_costs() if costs is None else np.asarray(costs, dtype=float)
+    costs = np.broadcast_to(costs, matrix.shape)
+
+    chosen = np.zeros(matrix.shape, dtype=bool)
+    total_cost = np.zeros(len(matrix))
+    for start in range(0, len(matrix), chunk_size):
+        rows = slice(start, start + chunk_size)
+        chosen[rows], total_cost[rows] = _plan_chunk(matrix[rows], target, costs[rows])
+    return chosen, total_cost, scores_from_matrix(matrix | chosen)
+
+
+def _plan_chunk(matrix, target, costs):
+    n, n_questions = matrix.shape
+    # Points each building still needs, at most MAX_POINTS + 1 (meaning unreachable)
+    need = np.clip(target + BASE_PENALTY - matrix @ QUESTION_POINTS, 0, MAX_POINTS + 1)
+    # Measures already in place cannot be bought again
+    costs = np.where(matrix, np.inf, costs)
+
+    # best[b, g]: cheapest cost to gain at least g points from the measures seen so far
+    best = np.full((n, MAX_POINTS + 2), np.inf)
+    best[:, 0] = 0
+    taken = np.zeros((n_questions,) + best.shape, dtype=bool)
+    with_q = np.empty_like(best)
+    for q in range(n_questions):
+        points = QUESTION_POINTS[q]
+        # Taking q covers g points if the other measures cover the remaining max(g - points, 0)
+        with_q[:, points:] = best[:, :-points]
+        with_q[:, :points] = best[:, :1]
+        with_q += costs[:, q, None]
+        np.less(with_q, best, out=taken[q])
+        np.minimum(best, with_q, out=best)
+
+    rows = np.arange(n)
+    total_cost = best[rows, need]
+    feasible = np.isfinite(total_cost)
+    chosen = np.zeros(matrix.shape, dtype=bool)
+    g = need.copy()
+    for q in range(n_questions - 1, -1, -1):
+        pick = taken[q, rows, g] & feasible
+        chosen[:, q] = pick
+        g = np.where(pick, np.maximum(g - QUESTION_POINTS[q], 0), g)
+    return chosen, total_cost
+
+
+def plan_improvements(bits, target, costs=None):
+    """Cheapest plan for one building given its answer bits, or None if `target` is out of reach"""
+    row = ((bits >> np.arange(len(QUESTIONS))) & 1).astype(bool)
+    chosen, total_cost, score = plan_portfolio(row[None, :], target, costs)
+    if not np.isfinite(total_cost[0]):
+        return None
+    return Plan(tuple(np.flatnonzero(chosen[0]).tolist()), float(total_cost[0]), int(score[0]))
+
+
+def read_costs(path, building_type="Home"):
+    costs = default_costs(building_type)
+    keys = [key for key, _, _ in QUESTIONS]
+    for question, cost in read_table(path)[["question", "cost"]].itertuples(index=False):
+        if question not in keys:
+            raise ValueError(f"Unknown question in costs file: {question}")
+        costs[keys.index(question)] = cost
+    return costs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or Parquet file with one row per building")
+    parser.add_argument("--target", type=int, required=True, help="green score to reach (0-100)")
+    parser.add_argument("--costs", help="CSV or Parquet file with question and cost columns")
+    parser.add_argument("--building-type", default="Home", choices=sorted(BUILDING_COST_SCALE))
+    parser.add_argument("-o", "--output", help="CSV or Parquet file to write (default: <input>_plans.csv)")
+    args = parser.parse_args(argv)
+
+    df = read_table(args.input)
+    try:
+        matrix, used = answer_matrix(df)
+        costs = read_costs(args.costs, args.building_type) if args.costs else default_costs(args.building_type)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    chosen, total_cost, new_scores = plan_portfolio(matrix, args.target, costs)
+    keys = np.array([key for key, _, _ in QUESTIONS])
+    feasible = np.isfinite(total_cost)
+
+    out = df.drop(columns=used)
+    out["current_score"] = scores_from_matrix(matrix)
+    out["reachable"] = feasible
+    out["plan_cost"] = np.where(feasible, total_cost, np.nan)
+    out["planned_score"] = np.where(feasible, new_scores, out["current_score"])
+    out["measures"] = [";".join(keys[row]) for row in chosen]
+
+    output = args.output or os.path.splitext(args.input)[0] + "_plans.csv"
+    write_table(out, output)
+    print(f"Planned {len(out)} buildings for target {args.target} -> {output} "
+          f"({feasible.sum()} reachable, total cost {total_cost[feasible].sum():,.0f})")
+
+
+if __name__ == "__main__":
+    main()
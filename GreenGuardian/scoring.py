@@ -0,0 +1,223 @@
+"""Green score calculation, usable without Streamlit for whole building portfolios.
+
+Usage (from the repository root):
+
+    python GreenGuardian/scoring.py portfolio.csv -o scores.csv
+    python GreenGuardian/scoring.py portfolio.parquet -o scores.parquet
+
+The input has one row per building and one column per question. Columns
+are named by the short keys in QUESTIONS (e.g. `led_lighting`) or by the
+full question text. Answers may be booleans, 1/0, yes/no, y/n or
+true/false, and blanks count as "No". Other columns such as IDs are
+copied to the output, which adds one percentage column per category and
+`total_score`. test_scoring.py checks both scorers against the original
+formula on every possible answer combination.
+"""
+import argparse
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+CATEGORY_WEIGHTS = {
+    "Energy Efficiency": 0.30,
+    "Water Conservation": 0.25,
+    "Waste Management": 0.25,
+    "Material Sustainability": 0.20
+}
+
+# (key, category, question) in questionnaire order
+QUESTIONS = (
+    ("led_lighting", "Energy Efficiency", "Does your building use LED lighting throughout?"),
+    ("insulation", "Energy Efficiency", "Is your building well-insulated (walls, attic, basement)?"),
+    ("smart_thermostat", "Energy Efficiency", "Do you have a programmable or smart thermostat?"),
+    ("renewable_energy", "Energy Efficiency", "Does your building use solar panels or renewable energy?"),
+    ("efficient_windows", "Energy Efficiency", "Are your windows energy-efficient (double/triple-pane)?"),
+    ("low_flow_fixtures", "Water Conservation", "Does your building have low-flow showerheads and faucets?"),
+    ("efficient_toilets", "Water Conservation", "Do you use dual-flush or low-flow toilets?"),
+    ("rainwater_harvesting", "Water Conservation", "Is there a rainwater harvesting system in place?"),
+    ("drought_resistant_landscaping", "Water Conservation", "Does your landscaping use drought-resistant plants?"),
+    ("leak_detection", "Water Conservation", "Are there systems in place to quickly detect and fix leaks?"),
+    ("recycling_program", "Waste Management", "Is there a comprehensive recycling program?"),
+    ("composting", "Waste Management", "Do you compost organic waste?"),
+    ("packaging_reduction", "Waste Management", "Are there efforts to reduce packaging waste?"),
+    ("donate_repurpose", "Waste Management", "Do you donate or repurpose items instead of discarding?"),
+    ("reusables", "Waste Management", "Are reusable materials prioritized over single-use items?"),
+    ("recycled_materials", "Material Sustainability", "Are building materials made from recycled content?"),
+    ("local_materials", "Material Sustainability", "Do you use locally-sourced building materials?"),
+    ("low_voc_finishes", "Material Sustainability", "Are low-VOC paints and finishes used throughout?"),
+    ("sustainable_flooring", "Material Sustainability", "Is sustainable flooring (bamboo, cork, reclaimed wood) installed?"),
+    ("sustainable_furniture", "Material Sustainability", "Are furniture and fixtures made from sustainable materials?"),
+)
+
+QUESTIONNAIRE = {
+    category: tuple(text for _, c, text in QUESTIONS if c == category)
+    for category in CATEGORY_WEIGHTS
+}
+
+# Each of these answered "No" costs a flat penalty on top of the weighted score
+CRITICAL_QUESTIONS = (
+    "Does your building use LED lighting throughout?",
+    "Is your building well-insulated (walls, attic, basement)?",
+    "Is there a rainwater harvesting system in place?",
+    "Is there a comprehensive recycling program?"
+)
+CRITICAL_PENALTY = 5
+
+CATEGORY_COLUMNS = {category: category.lower().replace(" ", "_") for category in CATEGORY_WEIGHTS}
+
+# Compiled once at import. A question's ID is its position in QUESTIONS, and a building's
+# answers are an int "answer bits" with bit ID set for every "Yes".
+QUESTION_TEXTS = tuple(text for _, _, text in QUESTIONS)
+QUESTION_IDS = {text: i for i, text in enumerate(QUESTION_TEXTS)}
+CATEGORY_QUESTION_IDS = {
+    category: tuple(i for i, (_, c, _) in enumerate(QUESTIONS) if c == category)
+    for category in CATEGORY_WEIGHTS
+}
+CATEGORY_MASKS = {category: sum(1 << i for i in ids) for category, ids in CATEGORY_QUESTION_IDS.items()}
+CRITICAL_MASK = sum(1 << QUESTION_IDS[q] for q in CRITICAL_QUESTIONS)
+ALL_MASK = (1 << len(QUESTIONS)) - 1
+_CATEGORY_TABLE = tuple(
+    (CATEGORY_MASKS[category], len(CATEGORY_QUESTION_IDS[category]), weight)
+    for category, weight in CATEGORY_WEIGHTS.items()
+)
+
+# Question-by-category 0/1 matrix, category weights and critical-question columns, in QUESTIONS order
+_MEMBERSHIP = np.array([[c == category for category in CATEGORY_WEIGHTS] for _, c, _ in QUESTIONS], np.int32)
+_SIZES = _MEMBERSHIP.sum(axis=0)
+_WEIGHTS = np.array(list(CATEGORY_WEIGHTS.values()))
+_CRITICAL = np.array([QUESTION_IDS[q] for q in CRITICAL_QUESTIONS])
+
+TRUE_VALUES = frozenset({"1", "1.0", "true", "t", "yes", "y"})
+FALSE_VALUES = frozenset({"0", "0.0", "false", "f", "no", "n", "", "nan", "none"})
+
+
+def answers_to_bits(answers):
+    """Answer bits for a {question: bool} mapping; unanswered questions count as "No" """
+    bits = 0
+    for question, answer in answers.items():
+        if answer and question in QUESTION_IDS:
+            bits |= 1 << QUESTION_IDS[question]
+    return bits
+
+
+def score_bits(bits):
+    """Score one building from its answer bits"""
+    total_weighted_score = 0
+    for mask, size, weight in _CATEGORY_TABLE:
+        total_weighted_score += (bits & mask).bit_count() / size * weight
+
+    final_score = total_weighted_score * 100
+    final_score -= CRITICAL_PENALTY * (CRITICAL_MASK & ~bits).bit_count()
+    return max(0, min(100, round(final_score)))
+
+
+def category_percentages_bits(bits):
+    """Per-category share of "Yes" answers for one building's answer bits, as rounded percentages"""
+    return {
+        category: round((bits & mask).bit_count() / size * 100)
+        for category, (mask, size, _) in zip(CATEGORY_WEIGHTS, _CATEGORY_TABLE)
+    }
+
+
+def score_answers(answers):
+    """Score one building from a {question: bool} mapping"""
+    return score_bits(answers_to_bits(answers))
+
+
+def category_percentages(answers):
+    """Per-category share of "Yes" answers for a {question: bool} mapping, as rounded percentages"""
+    return category_percentages_bits(answers_to_bits(answers))
+
+
+def score_matrix(matrix):
+    """Score many buildings at once from an (n_buildings, n_questions) boolean matrix in QUESTIONS order.
+
+    Returns (category percentages as an (n, n_categories) int array, total scores as an (n,) int array).
+    """
+    matrix = np.asarray(matrix, dtype=bool)
+    counts = matrix.astype(np.int32) @ _MEMBERSHIP
+    fractions = counts / _SIZES
+
+    totals = (fractions * _WEIGHTS).sum(axis=1) * 100
+    totals -= CRITICAL_PENALTY * np.count_nonzero(~matrix[:, _CRITICAL], axis=1)
+    totals = np.clip(np.round(totals), 0, 100).astype(np.int64)
+    return np.round(fractions * 100).astype(np.int64), totals
+
+
+def _column_for(df, key, text):
+    if key in df.columns:
+        return key
+    if text in df.columns:
+        return text
+    return None
+
+
+def answer_matrix(df):
+    """Boolean answer matrix (rows of `df`, QUESTIONS order) plus the names of the columns used"""
+    columns = [_column_for(df, key, text) for key, _, text in QUESTIONS]
+    missing = [key for (key, _, _), column in zip(QUESTIONS, columns) if column is None]
+    if missing:
+        raise ValueError(f"Missing question columns: {', '.join(missing)}")
+
+    matrix = np.empty((len(df), len(QUESTIONS)), dtype=bool)
+    for i, column in enumerate(columns):
+        values = df[column]
+        if values.dtype == bool:
+            matrix[:, i] = values.to_numpy()
+            continue
+        # Blank cells come back as NaN/None, which astype(str) does not turn into a known string
+        blank = values.isna()
+        normalized = values.astype(str).str.strip().str.lower()
+        known = blank | normalized.isin(TRUE_VALUES) | normalized.isin(FALSE_VALUES)
+        if not known.all():
+            raise ValueError(f"Column '{column}' has unrecognized answers, e.g. {values[~known].iloc[0]!r}")
+        matrix[:, i] = (~blank & normalized.isin(TRUE_VALUES)).to_numpy()
+    return matrix, columns
+
+
+def score_portfolio(df):
+    """Score every building in `df`; returns its non-question columns plus category and total scores"""
+    matrix, used = answer_matrix(df)
+    percentages, totals = score_matrix(matrix)
+
+    out = df.drop(columns=used)
+    for i, category in enumerate(CATEGORY_WEIGHTS):
+        out[CATEGORY_COLUMNS[category]] = percentages[:, i]
+    out["total_score"] = totals
+    return out
+
+
+def read_table(path):
+    if path.endswith(".parquet"):
+        return pd.read_parquet(path, memory_map=True)
+    return pd.read_csv(path, low_memory=False)
+
+
+def write_table(df, path):
+    if path.endswith(".parquet"):
+        df.to_parquet(path, index=False)
+    else:
+        df.to_csv(path, index=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("input", help="CSV or Parquet file with one row per building")
+    parser.add_argument("-o", "--output", help="CSV or Parquet file to write (default: <input>_scores.csv)")
+    args = parser.parse_args(argv)
+
+    df = read_table(args.input)
+    try:
+        scores = score_portfolio(df)
+    except ValueError as e:
+        sys.exit(str(e))
+
+    output = args.output or os.path.splitext(args.input)[0] + "_scores.csv"
+    write_table(scores, output)
+    print(f"Scored {len(scores)} buildings -> {output} (mean total score {scores['total_score'].mean():.1f})")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+import io
+
+import numpy as np
+import pandas as pd
+
+from scoring import QUESTION_TEXTS, QUESTIONS, answer_matrix, score_bits, score_matrix
+
+# The scoring rules as originally written in main.calculate_score, kept here independently of scoring.py
+BASELINE_QUESTIONNAIRE = {
+    "Energy Efficiency": [
+        "Does your building use LED lighting throughout?",
+        "Is your building well-insulated (walls, attic, basement)?",
+        "Do you have a programmable or smart thermostat?",
+        "Does your building use solar panels or renewable energy?",
+        "Are your windows energy-efficient (double/triple-pane)?"
+    ],
+    "Water Conservation": [
+        "Does your building have low-flow showerheads and faucets?",
+        "Do you use dual-flush or low-flow toilets?",
+        "Is there a rainwater harvesting system in place?",
+        "Does your landscaping use drought-resistant plants?",
+        "Are there systems in place to quickly detect and fix leaks?"
+    ],
+    "Waste Management": [
+        "Is there a comprehensive recycling program?",
+        "Do you compost organic waste?",
+        "Are there efforts to reduce packaging waste?",
+        "Do you donate or repurpose items instead of discarding?",
+        "Are reusable materials prioritized over single-use items?"
+    ],
+    "Material Sustainability": [
+        "Are building materials made from recycled content?",
+        "Do you use locally-sourced building materials?",
+        "Are low-VOC paints and finishes used throughout?",
+        "Is sustainable flooring (bamboo, cork, reclaimed wood) installed?",
+        "Are furniture and fixtures made from sustainable materials?"
+    ]
+}
+BASELINE_WEIGHTS = {
+    "Energy Efficiency": 0.30,
+    "Water Conservation": 0.25,
+    "Waste Management": 0.25,
+    "Material Sustainability": 0.20
+}
+BASELINE_CRITICAL = [
+    "Does your building use LED lighting throughout?",
+    "Is your building well-insulated (walls, attic, basement)?",
+    "Is there a rainwater harvesting system in place?",
+    "Is there a comprehensive recycling program?"
+]
+
+
+def baseline_score(answers):
+    total_weighted_score = 0
+    for category, questions in BASELINE_QUESTIONNAIRE.items():
+        yes_count = sum(1 for q in questions if answers.get(q, False))
+        total_weighted_score += yes_count / len(questions) * BASELINE_WEIGHTS[category]
+
+    final_score = total_weighted_score * 100
+    final_score -= sum(5 for cq in BASELINE_CRITICAL if not answers.get(cq, False))
+    return max(0, min(100, round(final_score)))
+
+
+def test_question_order_matches_baseline():
+    assert QUESTION_TEXTS == tuple(q for questions in BASELINE_QUESTIONNAIRE.values() for q in questions)
+
+
+def test_scorers_match_baseline_on_all_combinations():
+    n = len(QUESTION_TEXTS)
+    codes = np.arange(2 ** n, dtype=np.int64)
+    matrix = ((codes[:, None] >> np.arange(n)) & 1).astype(bool)
+    _, totals = score_matrix(matrix)
+
+    mismatches = []
+    for code, total in zip(range(2 ** n), totals.tolist()):
+        answers = {q: bool(code >> i & 1) for i, q in enumerate(QUESTION_TEXTS)}
+        expected = baseline_score(answers)
+        if total != expected or score_bits(code) != expected:
+            mismatches.append(code)
+    assert not mismatches, f"{len(mismatches)} combinations differ, e.g. answer bits {mismatches[0]:#x}"
+
+
+def test_blank_answers_count_as_no():
+    keys = [key for key, _, _ in QUESTIONS]
+    rows = ["id," + ",".join(keys), "a," + ",".join(["yes"] * 20), "b," + "," * 19, "c,1.0," + "0," * 18 + "1"]
+    # Read back from CSV, so blanks arrive the way pandas actually produces them (NaN in str and float columns)
+    df = pd.read_csv(io.StringIO("\n".join(rows) + "\n"))
+    df.loc[0, "composting"] = None
+
+    matrix, _ = answer_matrix(df)
+    assert not matrix[1].any()
+    assert not matrix[0, keys.index("composting")]
+    assert matrix[0].sum() == 19
+    assert matrix[2].tolist() == [True] + [False] * 18 + [True]
@@ -1,59 +1,244 @@
-from flask import Flask, request, jsonify, render_template
-import cv2
+import os
+import json
+import sys
+import threading
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from flask import Blueprint, Flask, Response, request, jsonify, render_template
 import base64
 import numpy as np
-from cvzone.ClassificationModule import Classifier
-
-app = Flask(__name__)
-
-# Load classifier
-classifier = Classifier('Wasteseg/Model/keras_model.h5', 'Wasteseg/Model/labels.txt')
-
-CLASS_MAPPING = {
-    0: 'Unknown/None',
-    1: 'Cardboard-Biodegradable',
-    2: 'Glass-Solid Waste',
-    3: 'Footwear-Textile waste',
-    4: 'Clothes-Textile waste',
-    5: 'Metal-Non-Biodegradable',
-    6: 'Paper-Biodegradable',
-    7: 'Battery-Hazardous',
-    8: 'Organic Waste-Biodegradable',
-    9: 'Toothbrush-Non-Biodegradable',
-    10: 'Diaper/Pads-Rejected Waste',
-    11: 'Mask-Household waste',
-    12: 'Plastic-Non-biodegradable',
-    13: 'Phone-E-waste',
-}
+
+from backends import load_backend, preload_model
+from gating import FrameGate
+from inference import CLASS_MAPPING, BatchingPredictor, Overloaded, decode_frame
+from metrics import PREDICTIONS, REGISTRY, REQUESTS, STAGE_SECONDS, Gauge, SharedMetrics
+from streaming import LatestFrame, pump_frames
+from workers import WorkerPool
+
+try:
+    from flask_sock import Sock
+except ImportError:
+    Sock = None
+
+bp = Blueprint('wasteseg', __name__)
+
+# Batching configuration
+MAX_BATCH_SIZE = int(os.getenv('WASTESEG_MAX_BATCH_SIZE', 8))
+MAX_WAIT_MS = float(os.getenv('WASTESEG_MAX_WAIT_MS', 10))
+MAX_QUEUE_SIZE = int(os.getenv('WASTESEG_MAX_QUEUE_SIZE', 256))
+PREDICT_TIMEOUT = float(os.getenv('WASTESEG_PREDICT_TIMEOUT', 5))
+
+# Frame gating (opt-in): frames closer than this to the last classified one reuse its result.
+# It compares whole-frame thumbnails, so a small item swapped on an unchanged background can be
+# under the threshold and get the previous item's class; /predict sessions without X-Client-Id
+# are keyed by remote address, so clients behind one NAT share a cache. 4 suits a fixed camera.
+GATE_THRESHOLD = float(os.getenv('WASTESEG_GATE_THRESHOLD', 0))
+
+# Inference backend: keras, onnx, onnx-int8, tflite or tflite-int8 (see export_model.py)
+MODEL_DIR = os.getenv('WASTESEG_MODEL_DIR', 'Wasteseg/Model')
+BACKEND = os.getenv('WASTESEG_BACKEND', 'keras')
+
+# Worker pool: run the model in this many processes (0 keeps inference in the Flask process)
+WORKERS = int(os.getenv('WASTESEG_WORKERS', 0))
+WORKER_THREADS = int(os.getenv('WASTESEG_WORKER_THREADS', 1))
+
+# Preforking servers (gunicorn.conf.py): read the model in the parent so workers share it copy-on-write
+PRELOAD = os.getenv('WASTESEG_PRELOAD', '0') == '1'
+
+# Directory where every server process publishes its metrics, so /metrics reports all of them
+METRICS_DIR = os.getenv('WASTESEG_METRICS_DIR')
+shared_metrics = SharedMetrics(REGISTRY, METRICS_DIR) if METRICS_DIR else None
+
+gate = FrameGate(GATE_THRESHOLD)
+
+# The predictor owns a batching thread (or worker processes), which must belong to the
+# process serving requests. Servers create it with init_worker() right after forking, before
+# any request thread starts (WorkerPool forks too); otherwise it is created on first use.
+_model_bytes = None
+_predictor = None
+_predictor_pid = None
+_predictor_lock = threading.Lock()
+
+def get_predictor():
+    global _predictor, _predictor_pid
+    if _predictor_pid != os.getpid():
+        with _predictor_lock:
+            if _predictor_pid != os.getpid():
+                if WORKERS > 0:
+                    _predictor = WorkerPool(BACKEND, MODEL_DIR, WORKERS, slots=MAX_QUEUE_SIZE,
+                                            max_batch_size=MAX_BATCH_SIZE, threads_per_worker=WORKER_THREADS,
+                                            model_bytes=_model_bytes)
+                else:
+                    backend = load_backend(BACKEND, MODEL_DIR, model_bytes=_model_bytes)
+                    _predictor = BatchingPredictor(backend, MAX_BATCH_SIZE, MAX_WAIT_MS, MAX_QUEUE_SIZE)
+                _predictor_pid = os.getpid()
+    return _predictor
+
+def init_worker():
+    """Per-process startup for preforking servers: call in each worker after the fork, before serving"""
+    get_predictor()
+    if shared_metrics is not None:
+        shared_metrics.start()
+
+def queue_depth():
+    return _predictor.queue_depth() if _predictor_pid == os.getpid() else 0
+
+REGISTRY.register(Gauge('wasteseg_queue_depth', 'Frames waiting for or in inference', queue_depth))
+
+
+def classify(img, session):
+    """Return the class id for a decoded frame, reusing the session's last result if the frame is unchanged"""
+    if gate.enabled:
+        with STAGE_SECONDS.time('gate'):
+            sig, classID = gate.lookup(session, img)
+    else:
+        sig, classID = None, None
+
+    if classID is None:
+        with STAGE_SECONDS.time('inference'):
+            classID = get_predictor().predict(img, timeout=PREDICT_TIMEOUT)[1]
+        if gate.enabled:
+            gate.store(session, sig, classID)
+
+    PREDICTIONS.inc(CLASS_MAPPING.get(classID, 'Unknown Waste Type'))
+    return classID
+
+# Gate hit/miss counters of the process that answers (use /metrics for server-wide totals)
+@bp.route('/stats')
+def stats():
+    return jsonify({'pid': os.getpid(), 'gate': gate.stats()})
+
+# Prometheus scrape endpoint; covers every worker process when WASTESEG_METRICS_DIR is set
+@bp.route('/metrics')
+def metrics():
+    body = shared_metrics.render() if shared_metrics is not None else REGISTRY.render()
+    return Response(body, mimetype='text/plain; version=0.0.4')
 
 # Serve HTML page
-@app.route('/')
+@bp.route('/')
 def home():
     return render_template('index.html')
 
-# Prediction endpoint
-@app.route('/predict', methods=['POST'])
-def predict():
-    data = request.json
+def data_url_to_buffer(img_data):
+    encoded_data = img_data.split(',')[1] if ',' in img_data else img_data
+    return np.frombuffer(base64.b64decode(encoded_data), np.uint8)
+
+# Raw frame uploads are decoded straight from the request body
+RAW_IMAGE_TYPES = ('application/octet-stream', 'image/jpeg')
+
+def read_frame_buffer():
+    """Return the uploaded frame as a uint8 array, or None if no image was sent"""
+    if request.mimetype in RAW_IMAGE_TYPES:
+        body = request.get_data(cache=False)
+        return np.frombuffer(body, np.uint8) if body else None
+
+    if 'image' in request.files:
+        body = request.files['image'].read()
+        return np.frombuffer(body, np.uint8) if body else None
+
+    data = request.get_json(silent=True)
     if not data or 'image' not in data:
-        return jsonify({'error': 'No image provided'}), 400
+        return None
+    return data_url_to_buffer(data['image'])
+
+def predict_response(payload, status=200):
+    REQUESTS.inc('predict', status)
+    return jsonify(payload), status
 
-    img_data = data['image']
+# Prediction endpoint
+@bp.route('/predict', methods=['POST'])
+def predict():
     try:
-        encoded_data = img_data.split(',')[1] if ',' in img_data else img_data
-        np_arr = np.frombuffer(base64.b64decode(encoded_data), np.uint8)
-        img = cv2.imdecode(np_arr, cv2.IMREAD_COLOR)
+        with STAGE_SECONDS.time('read'):
+            np_arr = read_frame_buffer()
+        if np_arr is None:
+            return predict_response({'error': 'No image provided'}, 400)
+        with STAGE_SECONDS.time('imdecode'):
+            img = decode_frame(np_arr, get_predictor().input_size)
         if img is None:
-            return jsonify({'error': 'Could not decode image'}), 400
+            return predict_response({'error': 'Could not decode image'}, 400)
     except Exception as e:
-        return jsonify({'error': f'Image decoding failed: {str(e)}'}), 400
+        return predict_response({'error': f'Image decoding failed: {str(e)}'}, 400)
 
+    session = request.headers.get('X-Client-Id') or request.remote_addr
     try:
-        prediction, classID = classifier.getPrediction(img)
-        class_name = CLASS_MAPPING.get(classID, 'Unknown Waste Type')
-        return jsonify({'class_id': int(classID), 'prediction_text': class_name})
+        classID = classify(img, session)
+    except (Overloaded, FutureTimeoutError):
+        return predict_response({'error': 'Server busy, try again'}, 503)
     except Exception as e:
-        return jsonify({'error': f'Prediction failed: {str(e)}'}), 500
+        return predict_response({'error': f'Prediction failed: {str(e)}'}, 500)
+
+    class_name = CLASS_MAPPING.get(classID, 'Unknown Waste Type')
+    return predict_response({'class_id': int(classID), 'prediction_text': class_name})
+
+# Streaming endpoint: the client pushes binary JPEG frames (or data URLs) and
+# receives one JSON message per frame, an error for frames that cannot be decoded.
+# Frames that arrive while the previous one is still being classified replace it
+# instead of queueing.
+def message_to_buffer(message):
+    if isinstance(message, str):
+        return data_url_to_buffer(message)
+    return np.frombuffer(message, np.uint8) if message else None
+
+def classify_stream(ws):
+    frames = LatestFrame()
+    reader = threading.Thread(target=pump_frames, args=(ws, frames), daemon=True)
+    reader.start()
+    session = f'ws-{id(frames)}'
+
+    def reply(payload, status=200):
+        REQUESTS.inc('ws', status)
+        ws.send(json.dumps(payload))
+
+    try:
+        while True:
+            message = frames.get()
+            if message is None:
+                break
+
+            try:
+                np_arr = message_to_buffer(message)
+                if np_arr is None or not np_arr.size:
+                    reply({'error': 'No image provided'}, 400)
+                    continue
+                with STAGE_SECONDS.time('imdecode'):
+                    img = decode_frame(np_arr, get_predictor().input_size)
+            except Exception as e:
+                reply({'error': f'Image decoding failed: {str(e)}'}, 400)
+                continue
+            if img is None:
+                reply({'error': 'Could not decode image'}, 400)
+                continue
+
+            try:
+                classID = classify(img, session)
+            except (Overloaded, FutureTimeoutError):
+                reply({'error': 'Server busy, try again'}, 503)
+                continue
+            except Exception as e:
+                reply({'error': f'Prediction failed: {str(e)}'}, 500)
+                continue
+
+            class_name = CLASS_MAPPING.get(classID, 'Unknown Waste Type')
+            reply({'class_id': int(classID), 'prediction_text': class_name, 'dropped': frames.dropped})
+    finally:
+        gate.forget(session)
+
+def create_app(preload=PRELOAD):
+    """Build the Flask app; with `preload`, read the model now (before a preforking server forks)"""
+    global _model_bytes
+    if preload:
+        _model_bytes = preload_model(BACKEND, MODEL_DIR)
+
+    app = Flask(__name__)
+    app.register_blueprint(bp)
+    if Sock is not None:
+        Sock(app).route('/ws/predict')(classify_stream)
+    else:
+        print('wasteseg: flask-sock is not installed, so /ws/predict is disabled and the page falls back to POST '
+              '/predict (pip install -r Wasteseg/requirements.txt)', file=sys.stderr)
+    return app
 
 if __name__ == '__main__':
+    app = create_app()
+    init_worker()
     app.run(debug=True, port=5000)
@@ -0,0 +1,141 @@
+import os
+
+import numpy as np
+
+# Exported model file names inside the model directory
+MODEL_FILES = {
+    'keras': 'keras_model.h5',
+    'onnx': 'model.onnx',
+    'onnx-int8': 'model_int8.onnx',
+    'tflite': 'model.tflite',
+    'tflite-int8': 'model_int8.tflite',
+}
+
+
+class KerasBackend:
+    """Runs the original Keras model through cvzone's Classifier (pulls in full TensorFlow)"""
+
+    name = 'keras'
+
+    def __init__(self, model_path, labels_path=None):
+        from cvzone.ClassificationModule import Classifier
+
+        self.classifier = Classifier(model_path, labels_path)
+        self.model = self.classifier.model
+        height, width = self.model.input_shape[1:3]
+        self.input_size = (width, height)
+
+    def predict(self, batch):
+        return np.asarray(self.model.predict_on_batch(batch))
+
+
+class OnnxBackend:
+    """Runs an exported ONNX model with onnxruntime on the CPU"""
+
+    name = 'onnx'
+
+    def __init__(self, model_path, threads=0, model_bytes=None):
+        import onnxruntime as ort
+
+        options = ort.SessionOptions()
+        options.intra_op_num_threads = threads
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(model_bytes or model_path, options, providers=['CPUExecutionProvider'])
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        height, width = model_input.shape[1:3]
+        self.input_size = (width, height)
+
+    def predict(self, batch):
+        return self.session.run(None, {self.input_name: batch})[0]
+
+
+class TFLiteBackend:
+    """Runs an exported TFLite model, using tflite-runtime when it is installed instead of TensorFlow"""
+
+    name = 'tflite'
+
+    def __init__(self, model_path, threads=None, model_bytes=None):
+        try:
+            from tflite_runtime.interpreter import Interpreter
+        except ImportError:
+            from tensorflow.lite import Interpreter
+
+        # Given the file contents, TFLite reads weights straight from that buffer instead of copying them
+        if model_bytes is not None:
+            self.interpreter = Interpreter(model_content=model_bytes, num_threads=threads)
+        else:
+            self.interpreter = Interpreter(model_path=model_path, num_threads=threads)
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = self._input['shape'][0]
+        height, width = self._input['shape'][1:3]
+        self.input_size = (int(width), int(height))
+
+    def _resize(self, batch_size):
+        self.interpreter.resize_tensor_input(self._input['index'], [batch_size, *self._input['shape'][1:]])
+        self.interpreter.allocate_tensors()
+        self._input = self.interpreter.get_input_details()[0]
+        self._output = self.interpreter.get_output_details()[0]
+        self._batch_size = batch_size
+
+    def predict(self, batch):
+        if len(batch) != self._batch_size:
+            self._resize(len(batch))
+
+        # Fully int8-quantized models take quantized input and produce quantized output
+        dtype = self._input['dtype']
+        if dtype != np.float32:
+            scale, zero_point = self._input['quantization']
+            info = np.iinfo(dtype)
+            batch = np.clip(np.round(batch / scale + zero_point), info.min, info.max).astype(dtype)
+
+        self.interpreter.set_tensor(self._input['index'], batch)
+        self.interpreter.invoke()
+        output = self.interpreter.get_tensor(self._output['index'])
+
+        if output.dtype != np.float32:
+            scale, zero_point = self._output['quantization']
+            output = (output.astype(np.float32) - zero_point) * scale
+        return output
+
+
+def load_backend(name, model_dir, threads=None, model_bytes=None):
+    """Load the inference backend `name` (a key of MODEL_FILES) from `model_dir`, or from `model_bytes` if given"""
+    if name not in MODEL_FILES:
+        raise ValueError(f"Unknown backend '{name}', expected one of: {', '.join(MODEL_FILES)}")
+
+    model_path = os.path.join(model_dir, MODEL_FILES[name])
+    if name == 'keras':
+        return KerasBackend(model_path, os.path.join(model_dir, 'labels.txt'))
+    if name.startswith('onnx'):
+        return OnnxBackend(model_path, threads or 0, model_bytes)
+    return TFLiteBackend(model_path, threads, model_bytes)
+
+
+def preload_model(name, model_dir):
+    """Import the backend's runtime and read its model file, without creating a session.
+
+    Meant for a preforking server's parent process: the imported libraries and
+    the model bytes are then shared copy-on-write by every forked worker, which
+    builds its own session from the bytes. Sessions themselves are not created
+    before the fork because their thread pools do not survive it. Returns the
+    bytes to pass to load_backend, or None for keras (only TensorFlow is
+    imported).
+    """
+    if name not in MODEL_FILES:
+        raise ValueError(f"Unknown backend '{name}', expected one of: {', '.join(MODEL_FILES)}")
+
+    if name == 'keras':
+        import cvzone.ClassificationModule  # noqa: F401
+        return None
+    if name.startswith('onnx'):
+        import onnxruntime  # noqa: F401
+    else:
+        try:
+            import tflite_runtime.interpreter  # noqa: F401
+        except ImportError:
+            import tensorflow.lite  # noqa: F401
+    with open(os.path.join(model_dir, MODEL_FILES[name]), 'rb') as f:
+        return f.read()
@@ -0,0 +1,293 @@
+"""Classify a directory or tar archive of waste photos offline.
+
+Usage (from the repository root):
+
+    python Wasteseg/classify_batch.py photos/ -o results.csv
+    python Wasteseg/classify_batch.py photos.tar.gz -o results.parquet --format parquet --resume
+
+Images are streamed from the source and decoded by a thread pool. OpenCV
+releases the GIL, so decoding uses every core. Frames are then run through
+the selected backend in fixed-size batches. Results are appended as each
+batch finishes, and the key of every written image goes into a
+`<output>.done` checkpoint. After an interruption, `--resume` skips
+everything in the checkpoint or already in the output, so rows written
+just before a crash are not repeated. An existing output is never replaced unless
+`--overwrite` is given.
+"""
+import argparse
+import csv
+import os
+import sys
+import tarfile
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+
+import numpy as np
+
+from backends import MODEL_FILES, load_backend
+from inference import CLASS_MAPPING, decode_frame, preprocess_into
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+FIELDS = ['key', 'class_id', 'prediction_text', 'confidence', 'error']
+
+
+def iter_directory(directory):
+    """Yield (key, path) for every image below `directory`, keyed by relative path"""
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                path = os.path.join(root, name)
+                yield os.path.relpath(path, directory), path
+
+
+def iter_tar(path):
+    """Yield (key, bytes) for every image in a (possibly compressed) tar, read as a stream"""
+    with tarfile.open(path, mode='r|*') as archive:
+        for member in archive:
+            if member.isfile() and member.name.lower().endswith(IMAGE_EXTENSIONS):
+                yield member.name, archive.extractfile(member).read()
+
+
+def iter_source(source):
+    if os.path.isdir(source):
+        return iter_directory(source)
+    return iter_tar(source)
+
+
+def decode(item, out):
+    """Decode and preprocess one image into its slot of the batch tensor; returns (key, error)"""
+    key, data = item
+    try:
+        buf = np.fromfile(data, np.uint8) if isinstance(data, str) else np.frombuffer(data, np.uint8)
+        img = decode_frame(buf, (out.shape[1], out.shape[0]))
+        if img is None:
+            return key, 'Could not decode image'
+        preprocess_into(img, out)
+        return key, None
+    except Exception as e:
+        return key, str(e)
+
+
+class CsvSink:
+    def __init__(self, path, append, overwrite=False):
+        exists = os.path.exists(path)
+        if exists and not (append or overwrite):
+            raise SystemExit(f'{path} already exists; use --resume or --overwrite, or choose another output')
+        new_file = not (append and exists)
+        if not new_file:
+            _drop_partial_line(path)
+        self._path = path
+        self._file = open(path, 'w' if new_file else 'a', newline='')
+        self._writer = csv.DictWriter(self._file, fieldnames=FIELDS)
+        if new_file:
+            self._writer.writeheader()
+
+    def keys(self):
+        """Keys already in the output, including rows written after the last checkpoint update"""
+        with open(self._path, newline='') as f:
+            return {row['key'] for row in csv.DictReader(f)}
+
+    def write(self, rows):
+        """Write rows and return the keys that are now safely on disk"""
+        self._writer.writerows(rows)
+        self._file.flush()
+        return [row['key'] for row in rows]
+
+    def close(self):
+        self._file.close()
+        return []
+
+
+class ParquetSink:
+    """Writes numbered part files into the output directory, one per `part_rows` results"""
+
+    def __init__(self, path, append, part_rows=50000, overwrite=False):
+        import pyarrow
+        import pyarrow.parquet
+
+        self._pq = pyarrow.parquet
+        self._schema = pyarrow.schema([
+            ('key', pyarrow.string()),
+            ('class_id', pyarrow.int32()),
+            ('prediction_text', pyarrow.string()),
+            ('confidence', pyarrow.float32()),
+            ('error', pyarrow.string()),
+        ])
+        self._table = pyarrow.Table
+        os.makedirs(path, exist_ok=True)
+        existing = [name for name in os.listdir(path) if name.startswith('part-')]
+        if existing and not (append or overwrite):
+            raise SystemExit(f'{path} already contains results; use --resume or --overwrite, or choose another output')
+        if overwrite:
+            for name in existing:
+                os.remove(os.path.join(path, name))
+            existing = []
+        self._path = path
+        self._part = len(existing)
+        self._part_rows = part_rows
+        self._rows = []
+
+    def write(self, rows):
+        self._rows.extend(rows)
+        if len(self._rows) >= self._part_rows:
+            return self._flush()
+        return []
+
+    def keys(self):
+        """Keys already in the output, including parts written after the last checkpoint update"""
+        keys = set()
+        for name in sorted(os.listdir(self._path)):
+            if name.startswith('part-') and name.endswith('.parquet'):
+                keys.update(self._pq.read_table(os.path.join(self._path, name), columns=['key'])['key'].to_pylist())
+        return keys
+
+    def _flush(self):
+        if not self._rows:
+            return []
+        table = self._table.from_pylist(self._rows, schema=self._schema)
+        # Written under a temporary name first, so a crash never leaves a truncated part behind
+        path = os.path.join(self._path, f'part-{self._part:05d}.parquet')
+        self._pq.write_table(table, path + '.tmp')
+        os.replace(path + '.tmp', path)
+        self._part += 1
+        keys = [row['key'] for row in self._rows]
+        self._rows = []
+        return keys
+
+    def close(self):
+        return self._flush()
+
+
+class Progress:
+    def __init__(self, interval=2.0):
+        self.interval = interval
+        self.start = self.last = time.monotonic()
+        self.done = 0
+        self.errors = 0
+
+    def update(self, done, errors, final=False):
+        self.done += done
+        self.errors += errors
+        now = time.monotonic()
+        if final or now - self.last >= self.interval:
+            self.last = now
+            rate = self.done / max(now - self.start, 1e-9)
+            end = '\n' if final else ''
+            print(f'\r{self.done} images, {self.errors} errors, {rate:.1f} img/s', end=end, file=sys.stderr, flush=True)
+
+
+def batched(iterable, size):
+    iterator = iter(iterable)
+    while True:
+        chunk = list(islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+def classify(items, backend, sink, checkpoint, batch_size, decode_workers, prefetch=4):
+    progress = Progress()
+    with ThreadPoolExecutor(decode_workers) as executor:
+        pending = deque()
+
+        def run(chunk):
+            width, height = backend.input_size
+            batch = np.zeros((len(chunk), height, width, 3), np.float32)
+            return batch, [executor.submit(decode, item, frame) for item, frame in zip(chunk, batch)]
+
+        chunks = batched(items, batch_size)
+        for chunk in islice(chunks, prefetch):
+            pending.append(run(chunk))
+
+        while pending:
+            batch, futures = pending.popleft()
+            decoded = [future.result() for future in futures]
+            # Keep the decoders busy on the next batches while this one runs through the model
+            for chunk in islice(chunks, 1):
+                pending.append(run(chunk))
+
+            rows = [{'key': key, 'class_id': -1, 'prediction_text': None, 'confidence': None, 'error': error}
+                    for key, error in decoded if error]
+            good = [i for i, (_, error) in enumerate(decoded) if not error]
+            if good:
+                # Failed slots stay zero-filled; they are run through the model but ignored
+                predictions = backend.predict(batch)
+                for i in good:
+                    key, prediction = decoded[i][0], predictions[i]
+                    class_id = int(np.argmax(prediction))
+                    rows.append({
+                        'key': key,
+                        'class_id': class_id,
+                        'prediction_text': CLASS_MAPPING.get(class_id, 'Unknown Waste Type'),
+                        'confidence': float(prediction[class_id]),
+                        'error': None,
+                    })
+
+            record(checkpoint, sink.write(rows))
+            progress.update(len(rows), len(decoded) - len(good))
+
+    record(checkpoint, sink.close())
+    progress.update(0, 0, final=True)
+
+
+def _drop_partial_line(path):
+    """Cut a row left half-written by a crash, so appended rows start on a line of their own"""
+    with open(path, 'rb+') as f:
+        data = f.read()
+        if data and not data.endswith(b'\n'):
+            f.truncate(data.rfind(b'\n') + 1)
+
+
+def record(checkpoint, keys):
+    if keys:
+        checkpoint.write(''.join(f'{key}\n' for key in keys))
+        checkpoint.flush()
+
+
+def load_checkpoint(path):
+    if not os.path.exists(path):
+        return set()
+    with open(path) as f:
+        return {line.rstrip('\n') for line in f}
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', help='directory of images or tar archive')
+    parser.add_argument('-o', '--output', required=True)
+    parser.add_argument('--format', choices=['csv', 'parquet'], default='csv')
+    parser.add_argument('--backend', choices=list(MODEL_FILES), default='keras')
+    parser.add_argument('--model-dir', default='Wasteseg/Model')
+    parser.add_argument('--batch-size', type=int, default=64)
+    parser.add_argument('--decode-workers', type=int, default=os.cpu_count())
+    parser.add_argument('--part-rows', type=int, default=50000, help='rows per Parquet part file')
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument('--resume', action='store_true', help='skip images recorded in the checkpoint')
+    mode.add_argument('--overwrite', action='store_true', help='replace existing results instead of refusing')
+    args = parser.parse_args(argv)
+
+    # Open the output first, so an existing one is refused before the model loads
+    if args.format == 'parquet':
+        sink = ParquetSink(args.output, args.resume, args.part_rows, args.overwrite)
+    else:
+        sink = CsvSink(args.output, args.resume, args.overwrite)
+
+    checkpoint_path = args.output.rstrip('/') + '.done'
+    # Rows reach the output before their keys reach the checkpoint, so a crash in between
+    # leaves keys only the output knows about; skipping those too keeps them from repeating
+    done = load_checkpoint(checkpoint_path) | sink.keys() if args.resume else set()
+    if done:
+        print(f'Resuming, skipping {len(done)} already classified images', file=sys.stderr)
+    backend = load_backend(args.backend, args.model_dir)
+
+    items = ((key, data) for key, data in iter_source(args.source) if key not in done)
+    with open(checkpoint_path, 'a' if args.resume else 'w') as checkpoint:
+        classify(items, backend, sink, checkpoint, args.batch_size, args.decode_workers)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,162 @@
+"""Export the Wasteseg Keras model to ONNX or TFLite and check it against the original.
+
+Usage (from the repository root):
+
+    python Wasteseg/export_model.py onnx --validation-dir data/val
+    python Wasteseg/export_model.py tflite --int8 --calibration-dir data/train --validation-dir data/val
+
+The exported file is written next to keras_model.h5 under the name the app
+expects for WASTESEG_BACKEND=onnx / onnx-int8 / tflite / tflite-int8.
+Quantized exports must be checked against a validation set. The model is
+exported to a temporary file and only replaces the served one if enough
+top-1 predictions still agree with Keras; otherwise the command fails and
+the existing model file is left as it was.
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+import cv2
+import numpy as np
+
+from backends import MODEL_FILES, load_backend
+from inference import preprocess
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp', '.webp')
+
+
+def iter_image_paths(directory):
+    for root, _, files in os.walk(directory):
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name)
+
+
+def load_frames(directory, size, limit=None):
+    frames = []
+    for path in iter_image_paths(directory):
+        img = cv2.imread(path, cv2.IMREAD_COLOR)
+        if img is None:
+            continue
+        frames.append(preprocess(img, size))
+        if limit and len(frames) >= limit:
+            break
+    return np.stack(frames) if frames else np.empty((0, size[1], size[0], 3), np.float32)
+
+
+def export_onnx(model, output_path, int8):
+    import tensorflow as tf
+    import tf2onnx
+
+    height, width = model.input_shape[1:3]
+    spec = (tf.TensorSpec((None, height, width, 3), tf.float32, name='input'),)
+    if not int8:
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=output_path)
+        return
+
+    # Weight-only int8 quantization; activations stay float so no calibration data is needed
+    from onnxruntime.quantization import QuantType, quantize_dynamic
+
+    # The float model is only an intermediate, so it must not replace an exported model.onnx
+    with tempfile.TemporaryDirectory() as tmp:
+        float_path = os.path.join(tmp, 'model.onnx')
+        tf2onnx.convert.from_keras(model, input_signature=spec, opset=13, output_path=float_path)
+        quantize_dynamic(float_path, output_path, weight_type=QuantType.QInt8)
+
+
+def export_tflite(model, output_path, int8, calibration):
+    import tensorflow as tf
+
+    converter = tf.lite.TFLiteConverter.from_keras_model(model)
+    if int8:
+        converter.optimizations = [tf.lite.Optimize.DEFAULT]
+        if len(calibration):
+            # Full integer quantization calibrated on representative frames
+            def representative_dataset():
+                for frame in calibration:
+                    yield [frame[np.newaxis]]
+
+            converter.representative_dataset = representative_dataset
+            converter.target_spec.supported_ops = [tf.lite.OpsSet.TFLITE_BUILTINS_INT8]
+            converter.inference_input_type = tf.int8
+            converter.inference_output_type = tf.int8
+
+    with open(output_path, 'wb') as f:
+        f.write(converter.convert())
+
+
+def top1_agreement(reference, candidate, frames, batch_size=32):
+    matches = 0
+    for start in range(0, len(frames), batch_size):
+        batch = frames[start:start + batch_size]
+        expected = np.argmax(reference.predict(batch), axis=1)
+        actual = np.argmax(candidate.predict(batch), axis=1)
+        matches += int(np.sum(expected == actual))
+    return matches / len(frames)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('format', choices=['onnx', 'tflite'])
+    parser.add_argument('--int8', action='store_true', help='quantize weights (and activations for TFLite) to int8')
+    parser.add_argument('--model-dir', default='Wasteseg/Model')
+    parser.add_argument('--calibration-dir', help='images used to calibrate full int8 TFLite quantization')
+    parser.add_argument('--calibration-size', type=int, default=200)
+    parser.add_argument('--validation-dir',
+                        help='images used to compare top-1 predictions with the Keras model (required with --int8)')
+    parser.add_argument('--min-agreement', type=float, default=0.98,
+                        help='fail if top-1 agreement with Keras is below this fraction')
+    args = parser.parse_args(argv)
+    if args.int8 and not args.validation_dir:
+        parser.error('--int8 requires --validation-dir, since quantization can change predictions')
+
+    name = args.format + ('-int8' if args.int8 else '')
+    output_path = os.path.join(args.model_dir, MODEL_FILES[name])
+
+    # Export next to the served file and only replace it once the export passed its check
+    fd, tmp_path = tempfile.mkstemp(prefix=f'.{MODEL_FILES[name]}.', suffix='.tmp', dir=args.model_dir)
+    os.close(fd)
+    try:
+        if not export_and_check(args, name, tmp_path):
+            print(f'Left {output_path} unchanged', file=sys.stderr)
+            return 1
+        os.chmod(tmp_path, 0o644)  # mkstemp creates it private to this user
+        os.replace(tmp_path, output_path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    print(f'Exported {name} model to {output_path}')
+    return 0
+
+
+def export_and_check(args, name, path):
+    """Export the Keras model to `path` and, with --validation-dir, check its top-1 agreement"""
+    reference = load_backend('keras', args.model_dir)
+    if args.format == 'onnx':
+        export_onnx(reference.model, path, args.int8)
+    else:
+        calibration = load_frames(args.calibration_dir, reference.input_size, args.calibration_size) \
+            if args.calibration_dir else []
+        export_tflite(reference.model, path, args.int8, calibration)
+
+    if not args.validation_dir:
+        return True
+
+    frames = load_frames(args.validation_dir, reference.input_size)
+    if not len(frames):
+        print(f'No images found in {args.validation_dir}', file=sys.stderr)
+        return False
+
+    with open(path, 'rb') as f:
+        candidate = load_backend(name, args.model_dir, model_bytes=f.read())
+    agreement = top1_agreement(reference, candidate, frames)
+    print(f'Top-1 agreement with Keras on {len(frames)} images: {agreement:.2%}')
+    if agreement < args.min_agreement:
+        print(f'Agreement is below the required {args.min_agreement:.2%}', file=sys.stderr)
+        return False
+    return True
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,77 @@
+import threading
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+from metrics import REGISTRY, Counter
+
+GATE_RESULTS = REGISTRY.register(Counter(
+    'wasteseg_gate_total', 'Frame gate lookups, by whether the cached result was reused', ['result']))
+
+
+class FrameGate:
+    """Skip inference for frames that have not meaningfully changed since the last classified one.
+
+    Each client session keeps a tiny grayscale thumbnail of the last frame that
+    was actually run through the model, together with its result. A new frame
+    whose thumbnail differs from it by less than `threshold` (mean absolute
+    difference in 0-255 gray levels) reuses the cached result. Comparing against
+    the last *classified* frame rather than the previous one means slow drift
+    still triggers a fresh prediction eventually.
+    """
+
+    def __init__(self, threshold=4.0, size=16, max_sessions=4096):
+        self.threshold = threshold
+        self.size = size
+        self.max_sessions = max_sessions
+        self._sessions = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @property
+    def enabled(self):
+        return self.threshold > 0
+
+    def signature(self, img):
+        gray = cv2.cvtColor(img, cv2.COLOR_BGR2GRAY)
+        return cv2.resize(gray, (self.size, self.size), interpolation=cv2.INTER_AREA).astype(np.int16)
+
+    def lookup(self, session, img):
+        """Return (signature, cached_result); cached_result is None when the model must run"""
+        sig = self.signature(img)
+        with self._lock:
+            entry = self._sessions.get(session)
+            if entry is not None:
+                self._sessions.move_to_end(session)
+                last_sig, result = entry
+                if np.abs(sig - last_sig).mean() < self.threshold:
+                    self.hits += 1
+                    GATE_RESULTS.inc('hit')
+                    return sig, result
+            self.misses += 1
+        GATE_RESULTS.inc('miss')
+        return sig, None
+
+    def store(self, session, sig, result):
+        with self._lock:
+            self._sessions[session] = (sig, result)
+            self._sessions.move_to_end(session)
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+
+    def forget(self, session):
+        with self._lock:
+            self._sessions.pop(session, None)
+
+    def stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'threshold': self.threshold,
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+                'sessions': len(self._sessions),
+            }
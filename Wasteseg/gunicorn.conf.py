@@ -0,0 +1,53 @@
+"""Production serving profile for Wasteseg.
+
+Run from the repository root, so the default WASTESEG_MODEL_DIR resolves:
+
+    gunicorn -c Wasteseg/gunicorn.conf.py
+
+Each worker process runs its own batching predictor (or worker pool), and
+request threads share it, so a few processes with several threads each
+batch best. With WASTESEG_PRELOAD=1 the app is imported in the master.
+The model runtime is imported and the model file read once, then forked
+workers share those pages copy-on-write. Each worker still builds its own
+session, since inference thread pools do not survive a fork.
+
+Each worker builds its predictor (and forks its WorkerPool, if any) in
+post_worker_init, before its request threads exist. Workers publish their
+metrics to WASTESEG_METRICS_DIR (a fresh temporary directory by default),
+so /metrics reports the whole server whichever worker answers. /stats
+stays per process.
+"""
+import glob
+import os
+import tempfile
+
+wsgi_app = 'wsgi:app'
+pythonpath = os.path.dirname(os.path.abspath(__file__))
+
+bind = os.getenv('WASTESEG_BIND', '0.0.0.0:5000')
+workers = int(os.getenv('WASTESEG_HTTP_WORKERS', 2))
+threads = int(os.getenv('WASTESEG_HTTP_THREADS', 8))
+# gthread keeps /ws/predict (flask-sock) working: each socket holds a thread, not a process
+worker_class = 'gthread'
+timeout = int(os.getenv('WASTESEG_HTTP_TIMEOUT', 30))
+graceful_timeout = 10
+keepalive = 5
+preload_app = os.getenv('WASTESEG_PRELOAD', '0') == '1'
+max_requests = int(os.getenv('WASTESEG_MAX_REQUESTS', 0))
+max_requests_jitter = max_requests // 10
+accesslog = os.getenv('WASTESEG_ACCESS_LOG', '-')
+
+# Inherited by the workers; stale snapshots from an earlier run are removed at startup
+if 'WASTESEG_METRICS_DIR' not in os.environ:
+    os.environ['WASTESEG_METRICS_DIR'] = tempfile.mkdtemp(prefix='wasteseg-metrics-')
+
+
+def on_starting(server):
+    for path in glob.glob(os.path.join(os.environ['WASTESEG_METRICS_DIR'], '*.json')):
+        os.remove(path)
+
+
+def post_worker_init(worker):
+    import app
+
+    app.init_worker()
@@ -0,0 +1,174 @@
+import threading
+import time
+from concurrent.futures import Future
+from queue import Queue, Empty, Full
+
+import cv2
+import numpy as np
+
+from metrics import BATCH_SIZE, STAGE_SECONDS
+
+# Input size (width, height) of the Teachable Machine model in Model/keras_model.h5
+INPUT_SIZE = (224, 224)
+
+CLASS_MAPPING = {
+    0: 'Unknown/None',
+    1: 'Cardboard-Biodegradable',
+    2: 'Glass-Solid Waste',
+    3: 'Footwear-Textile waste',
+    4: 'Clothes-Textile waste',
+    5: 'Metal-Non-Biodegradable',
+    6: 'Paper-Biodegradable',
+    7: 'Battery-Hazardous',
+    8: 'Organic Waste-Biodegradable',
+    9: 'Toothbrush-Non-Biodegradable',
+    10: 'Diaper/Pads-Rejected Waste',
+    11: 'Mask-Household waste',
+    12: 'Plastic-Non-biodegradable',
+    13: 'Phone-E-waste',
+}
+
+
+# Reduced-resolution JPEG decode modes, largest reduction first
+REDUCED_MODES = (
+    (8, cv2.IMREAD_REDUCED_COLOR_8),
+    (4, cv2.IMREAD_REDUCED_COLOR_4),
+    (2, cv2.IMREAD_REDUCED_COLOR_2),
+)
+
+# Start-of-frame markers carrying the image dimensions (DHT, JPG and DAC share the range)
+SOF_MARKERS = frozenset(range(0xC0, 0xD0)) - {0xC4, 0xC8, 0xCC}
+
+_scratch = threading.local()
+
+
+def jpeg_size(buf):
+    """Read (width, height) from a JPEG's start-of-frame header without decoding it, or None"""
+    data = memoryview(buf).cast('B')
+    n = len(data)
+    if n < 4 or data[0] != 0xFF or data[1] != 0xD8:
+        return None
+
+    i = 2
+    while i + 9 < n:
+        if data[i] != 0xFF:
+            return None
+        marker = data[i + 1]
+        if marker == 0xFF:
+            i += 1
+            continue
+        if marker == 0x01 or 0xD0 <= marker <= 0xD8:
+            i += 2
+            continue
+        if marker in SOF_MARKERS:
+            height = (data[i + 5] << 8) | data[i + 6]
+            width = (data[i + 7] << 8) | data[i + 8]
+            return width, height
+        i += 2 + ((data[i + 2] << 8) | data[i + 3])
+    return None
+
+
+def decode_frame(buf, size=INPUT_SIZE):
+    """Decode an encoded frame, letting libjpeg downscale by 2/4/8 while it still covers `size`"""
+    flag = cv2.IMREAD_COLOR
+    dims = jpeg_size(buf)
+    if dims:
+        width, height = dims
+        for factor, mode in REDUCED_MODES:
+            if width // factor >= size[0] and height // factor >= size[1]:
+                flag = mode
+                break
+    return cv2.imdecode(buf, flag)
+
+
+def preprocess_into(img, out):
+    """Resize and normalize a BGR frame into a preallocated float32 (H, W, 3) buffer"""
+    height, width = out.shape[:2]
+    resized = getattr(_scratch, 'frame', None)
+    if resized is None or resized.shape != out.shape:
+        resized = _scratch.frame = np.empty(out.shape, np.uint8)
+    cv2.resize(img, (width, height), dst=resized)
+    np.divide(resized, 127.0, out=out)
+    out -= 1
+    return out
+
+
+def preprocess(img, size=INPUT_SIZE):
+    """Resize and normalize a BGR frame the same way cvzone's Classifier does"""
+    return preprocess_into(img, np.empty((size[1], size[0], 3), np.float32))
+
+
+class Overloaded(Exception):
+    """Raised when the inference queue is full and the frame is rejected"""
+
+
+class BatchingPredictor:
+    """Queue frames from concurrent requests and run them through the model as one batch.
+
+    A single background thread waits for the first queued frame, then keeps
+    collecting until either `max_batch_size` frames are queued or `max_wait_ms`
+    has passed since the first one arrived. The queue is bounded so that under
+    overload requests fail fast instead of piling up latency.
+    """
+
+    def __init__(self, backend, max_batch_size=8, max_wait_ms=10, max_queue_size=256):
+        self.backend = backend
+        self.input_size = backend.input_size
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait_ms / 1000.0
+        self._queue = Queue(maxsize=max_queue_size)
+        self._batch = np.empty((max_batch_size, self.input_size[1], self.input_size[0], 3), np.float32)
+        self._thread = threading.Thread(target=self._run, name='batching-predictor', daemon=True)
+        self._thread.start()
+
+    def submit(self, img):
+        """Queue a decoded BGR frame; the future resolves to (prediction, class_id)"""
+        future = Future()
+        try:
+            self._queue.put_nowait((img, future, time.perf_counter()))
+        except Full:
+            raise Overloaded('Inference queue is full')
+        return future
+
+    def predict(self, img, timeout=None):
+        return self.submit(img).result(timeout)
+
+    def queue_depth(self):
+        return self._queue.qsize()
+
+    def _collect(self):
+        items = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+        while len(items) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                items.append(self._queue.get(timeout=remaining))
+            except Empty:
+                break
+        return items
+
+    def _run(self):
+        while True:
+            items = self._collect()
+            started = time.perf_counter()
+            for _, _, queued in items:
+                STAGE_SECONDS.observe(started - queued, 'queue_wait')
+            BATCH_SIZE.observe(len(items))
+
+            futures = [future for _, future, _ in items]
+            try:
+                batch = self._batch[:len(items)]
+                with STAGE_SECONDS.time('preprocess'):
+                    for frame, (img, _, _) in zip(batch, items):
+                        preprocess_into(img, frame)
+                with STAGE_SECONDS.time('model'):
+                    predictions = self.backend.predict(batch)
+            except Exception as e:
+                for future in futures:
+                    future.set_exception(e)
+                continue
+
+            for future, prediction in zip(futures, predictions):
+                future.set_result((list(prediction), int(np.argmax(prediction))))
@@ -0,0 +1,218 @@
+import glob
+import json
+import os
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+
+# Latency buckets in seconds, from sub-millisecond decodes up to slow batched inference
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+def _format_labels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    escaped = (str(v).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') for _, v in pairs)
+    return '{' + ','.join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + '}'
+
+
+class Counter:
+    def __init__(self, name, help, labelnames=()):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *labels, amount=1):
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0) + amount
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), value] for labels, value in self._values.items()]
+
+    def render(self, snapshots=None):
+        """Render this process's values, or the sum of `snapshots` from several processes"""
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        values = {}
+        for snapshot in snapshots:
+            for labels, value in snapshot:
+                values[tuple(labels)] = values.get(tuple(labels), 0) + value
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} counter']
+        for labels, value in sorted(values.items()):
+            lines.append(f'{self.name}{_format_labels(self.labelnames, labels)} {value}')
+        return lines
+
+
+class Gauge:
+    """Gauge whose value is read from a callback at scrape time"""
+
+    def __init__(self, name, help, read):
+        self.name, self.help, self.read = name, help, read
+
+    def snapshot(self):
+        return self.read()
+
+    def render(self, snapshots=None):
+        value = self.read() if snapshots is None else sum(snapshots)
+        return [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} gauge', f'{self.name} {value}']
+
+
+class Histogram:
+    def __init__(self, name, help, labelnames=(), buckets=LATENCY_BUCKETS):
+        self.name, self.help, self.labelnames = name, help, tuple(labelnames)
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *labels):
+        index = bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.get(labels)
+            if series is None:
+                series = self._series[labels] = [[0] * (len(self.buckets) + 1), 0.0]
+            series[0][index] += 1
+            series[1] += value
+
+    @contextmanager
+    def time(self, *labels):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start, *labels)
+
+    def snapshot(self):
+        with self._lock:
+            return [[list(labels), list(counts), total] for labels, (counts, total) in self._series.items()]
+
+    def render(self, snapshots=None):
+        """Render this process's series, or the sum of `snapshots` from several processes"""
+        if snapshots is None:
+            snapshots = [self.snapshot()]
+        merged = {}
+        for snapshot in snapshots:
+            for labels, counts, total in snapshot:
+                series = merged.setdefault(tuple(labels), [[0] * (len(self.buckets) + 1), 0.0])
+                series[0] = [a + b for a, b in zip(series[0], counts)]
+                series[1] += total
+
+        lines = [f'# HELP {self.name} {self.help}', f'# TYPE {self.name} histogram']
+        for labels, (counts, total) in sorted(merged.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), counts):
+                cumulative += count
+                le = _format_labels(self.labelnames, labels, [('le', bound)])
+                lines.append(f'{self.name}_bucket{le} {cumulative}')
+            plain = _format_labels(self.labelnames, labels)
+            lines.append(f'{self.name}_sum{plain} {total}')
+            lines.append(f'{self.name}_count{plain} {cumulative}')
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = []
+
+    def register(self, metric):
+        self._metrics.append(metric)
+        return metric
+
+    def snapshot(self):
+        return {metric.name: metric.snapshot() for metric in self._metrics}
+
+    def render(self, snapshots=None):
+        """Render this process's metrics, or merge `snapshots` ({name: metric snapshot} per process)"""
+        lines = []
+        for metric in self._metrics:
+            if snapshots is None:
+                lines.extend(metric.render())
+            else:
+                lines.extend(metric.render([s[metric.name] for s in snapshots if metric.name in s]))
+        return '\n'.join(lines) + '\n'
+
+
+class SharedMetrics:
+    """Metrics of every process of a preforking server, exchanged through a shared directory.
+
+    Each process writes a snapshot of `registry` to `<directory>/<pid>.json`
+    every `interval` seconds (and just before it renders), and `render()`
+    merges all snapshots: counters and histograms are summed over every
+    process that ever wrote one, so they keep counting across worker
+    restarts, while gauges only include live processes. Values from other
+    processes are up to `interval` seconds old.
+    """
+
+    def __init__(self, registry, directory, interval=2.0):
+        self.registry = registry
+        self.directory = directory
+        self.interval = interval
+        self._thread = None
+        self._pid = None
+        os.makedirs(directory, exist_ok=True)
+
+    def start(self):
+        """Start this process's writer thread (call after forking)"""
+        if self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._thread = threading.Thread(target=self._run, name='metrics-writer', daemon=True)
+            self._thread.start()
+
+    def write(self):
+        path = os.path.join(self.directory, f'{os.getpid()}.json')
+        tmp = f'{path}.{threading.get_ident()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.registry.snapshot(), f)
+        os.replace(tmp, path)
+
+    def collect(self):
+        """Snapshots of every process, without gauges of processes that have exited"""
+        self.write()
+        gauges = {metric.name for metric in self.registry._metrics if isinstance(metric, Gauge)}
+        snapshots = []
+        for path in glob.glob(os.path.join(self.directory, '*.json')):
+            try:
+                with open(path) as f:
+                    snapshot = json.load(f)
+            except (OSError, ValueError):
+                continue
+            if not _alive(int(os.path.basename(path)[:-5])):
+                snapshot = {name: value for name, value in snapshot.items() if name not in gauges}
+            snapshots.append(snapshot)
+        return snapshots
+
+    def render(self):
+        return self.registry.render(self.collect())
+
+    def _run(self):
+        while True:
+            time.sleep(self.interval)
+            try:
+                self.write()
+            except OSError:
+                pass
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+REGISTRY = Registry()
+
+STAGE_SECONDS = REGISTRY.register(Histogram(
+    'wasteseg_stage_seconds', 'Time spent in each stage of handling a frame', ['stage']))
+BATCH_SIZE = REGISTRY.register(Histogram(
+    'wasteseg_batch_size', 'Number of frames per model forward pass', buckets=(1, 2, 4, 8, 16, 32, 64, 128)))
+REQUESTS = REGISTRY.register(Counter(
+    'wasteseg_requests_total', 'Frames received, by endpoint and outcome', ['endpoint', 'status']))
+PREDICTIONS = REGISTRY.register(Counter(
+    'wasteseg_predictions_total', 'Frames classified, by predicted class', ['class_name']))
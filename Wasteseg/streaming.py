@@ -0,0 +1,52 @@
+import threading
+
+
+class LatestFrame:
+    """Single-slot mailbox holding only the newest frame pushed by a streaming client.
+
+    The socket reader thread calls `put` for every frame it receives; if the
+    inference loop has not picked up the previous frame yet, that frame is
+    stale and gets replaced, so a slow model never builds a backlog.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._frame = None
+        self._closed = False
+        self.received = 0
+        self.dropped = 0
+
+    def put(self, frame):
+        with self._cond:
+            if self._frame is not None:
+                self.dropped += 1
+            self._frame = frame
+            self.received += 1
+            self._cond.notify()
+
+    def get(self):
+        """Block until a frame is available; returns None once the stream is closed"""
+        with self._cond:
+            while self._frame is None and not self._closed:
+                self._cond.wait()
+            frame, self._frame = self._frame, None
+            return frame
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+
+
+def pump_frames(ws, frames):
+    """Read messages from `ws` into `frames` until the connection closes"""
+    try:
+        while True:
+            message = ws.receive()
+            if message is None:
+                break
+            frames.put(message)
+    except Exception:
+        pass
+    finally:
+        frames.close()
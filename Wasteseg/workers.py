@@ -0,0 +1,261 @@
+import atexit
+import multiprocessing as mp
+import queue
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from multiprocessing import shared_memory
+from multiprocessing.connection import wait
+
+import numpy as np
+
+from backends import load_backend
+from inference import INPUT_SIZE, Overloaded, preprocess_into
+from metrics import BATCH_SIZE, STAGE_SECONDS
+
+
+def _worker_main(backend_name, model_dir, threads, input_size, shm_name, frames_shape, tasks, results, max_batch_size,
+                 model_bytes=None):
+    """Worker process loop: load the model once, then classify slots of the shared frame buffer"""
+    try:
+        backend = load_backend(backend_name, model_dir, threads, model_bytes)
+        if tuple(backend.input_size) != tuple(input_size):
+            raise ValueError(f'Model input size {backend.input_size} does not match pool input size {input_size}')
+    except Exception as e:
+        results.send(('ready', repr(e)))
+        return
+
+    shm = shared_memory.SharedMemory(name=shm_name)
+    frames = np.ndarray(frames_shape, np.float32, buffer=shm.buf)
+    results.send(('ready', None))
+
+    stopping = False
+    while not stopping:
+        task = tasks.get()
+        if task is None:
+            break
+
+        # Drain whatever else is already waiting so it runs as one batch
+        batch = [task]
+        while len(batch) < max_batch_size:
+            try:
+                task = tasks.get_nowait()
+            except queue.Empty:
+                break
+            if task is None:
+                stopping = True
+                break
+            batch.append(task)
+
+        # Timings go back with the results, since only the parent's registry is scraped
+        started = time.perf_counter()
+        slots = [slot for slot, _ in batch]
+        waits = [started - queued for _, queued in batch]
+        try:
+            predictions = backend.predict(frames[slots])
+            done = [(slot, prediction, None) for slot, prediction in zip(slots, predictions)]
+        except Exception as e:
+            done = [(slot, None, repr(e)) for slot in slots]
+        results.send(('done', done, waits, time.perf_counter() - started))
+
+    del frames
+    shm.close()
+
+
+class _Worker:
+    """One worker process with its own task queue and result pipe, and the slots handed to it"""
+
+    def __init__(self, ctx, name, args):
+        self.tasks = ctx.Queue()
+        self.results, results = ctx.Pipe(duplex=False)
+        self.slots = set()
+        self.ready = False
+        self.process = ctx.Process(target=_worker_main, args=args(self.tasks, results), name=name, daemon=True)
+        self.process.start()
+        results.close()
+
+
+class WorkerPool:
+    """Run the model in several worker processes so inference is not serialized behind the GIL.
+
+    Request threads preprocess a frame straight into a free slot of a shared
+    memory buffer and only send the slot index to a worker, so frames are
+    never pickled. Each slot goes to the worker with the fewest slots in
+    flight; a worker drains up to `max_batch_size` queued slots per forward
+    pass and sends the (small) prediction vectors back, with its queue_wait
+    and model timings, to a collector thread that records the timings and
+    routes each prediction to the waiting request's future.
+
+    The collector also watches the worker processes. If one dies (OOM, a
+    crash in the runtime), the requests it held fail at once, their slots are
+    freed and a replacement worker is started. A worker that dies before it
+    has loaded the model is not replaced; once none are left, submit raises.
+
+    Workers are forked before the parent loads any model or starts threads,
+    so create the pool early at startup. `model_bytes` (see
+    backends.preload_model) is inherited through the fork, not copied.
+    Replacements are forked from the collector thread, as multiprocessing.Pool
+    does for its workers.
+    """
+
+    def __init__(self, backend_name, model_dir, workers, input_size=INPUT_SIZE, slots=256,
+                 max_batch_size=8, threads_per_worker=1, model_bytes=None):
+        self.input_size = tuple(input_size)
+        frames_shape = (slots, self.input_size[1], self.input_size[0], 3)
+        self._shm = shared_memory.SharedMemory(create=True, size=int(np.prod(frames_shape)) * 4)
+        self._frames = np.ndarray(frames_shape, np.float32, buffer=self._shm.buf)
+        self._free = queue.Queue()
+        for slot in range(slots):
+            self._free.put(slot)
+        self._futures = {}
+        self._lock = threading.Lock()
+        self._closed = False
+        self._error = None
+
+        self._ctx = mp.get_context('fork')
+        self._spawned = 0
+        self._args = lambda tasks, results: (backend_name, model_dir, threads_per_worker, self.input_size,
+                                             self._shm.name, frames_shape, tasks, results, max_batch_size,
+                                             model_bytes)
+        self._workers = [self._spawn() for _ in range(workers)]
+        atexit.register(self.close)
+        self._wait_ready()
+
+        self._collector = threading.Thread(target=self._collect, name='worker-pool-results', daemon=True)
+        self._collector.start()
+
+    def _spawn(self):
+        worker = _Worker(self._ctx, f'wasteseg-worker-{self._spawned}', self._args)
+        self._spawned += 1
+        return worker
+
+    def _wait_ready(self):
+        errors = []
+        for worker in self._workers:
+            try:
+                _, error = worker.results.recv()
+            except EOFError:
+                error = f'exited with code {worker.process.exitcode}'
+            if error:
+                errors.append(error)
+            worker.ready = True
+        if errors:
+            self.close()
+            raise RuntimeError(f'Worker failed to load the model: {errors[0]}')
+
+    def submit(self, img):
+        """Queue a decoded BGR frame; the future resolves to (prediction, class_id)"""
+        if self._error:
+            raise RuntimeError(self._error)
+        try:
+            slot = self._free.get_nowait()
+        except queue.Empty:
+            raise Overloaded('All frame slots are in use')
+
+        try:
+            with STAGE_SECONDS.time('preprocess'):
+                preprocess_into(img, self._frames[slot])
+        except BaseException:
+            self._free.put(slot)
+            raise
+        future = Future()
+        with self._lock:
+            if not self._workers:
+                self._free.put(slot)
+                raise RuntimeError(self._error or 'Worker pool is closed')
+            worker = min(self._workers, key=lambda w: len(w.slots))
+            worker.slots.add(slot)
+            self._futures[slot] = future
+            # perf_counter is system-wide monotonic on the platforms with fork, so workers can compare against it
+            worker.tasks.put((slot, time.perf_counter()))
+        return future
+
+    def predict(self, img, timeout=None):
+        return self.submit(img).result(timeout)
+
+    def queue_depth(self):
+        return len(self._futures)
+
+    def _collect(self):
+        while True:
+            with self._lock:
+                workers = list(self._workers)
+            if not workers:
+                break
+            sentinels = {worker.process.sentinel: worker for worker in workers}
+            connections = {worker.results: worker for worker in workers}
+            for ready in wait(list(sentinels) + list(connections)):
+                worker = connections.get(ready) or sentinels[ready]
+                if worker not in self._workers:
+                    continue
+                try:
+                    # Results sent before an exit are still in the pipe, so drain it before giving up on a worker
+                    while worker.results.poll():
+                        self._handle(worker, worker.results.recv())
+                except (EOFError, OSError):
+                    pass
+                if not worker.process.is_alive():
+                    self._replace(worker)
+
+    def _handle(self, worker, message):
+        kind, *payload = message
+        if kind == 'ready':
+            # Only a worker that loaded the model is worth replacing, otherwise it would just fail again
+            worker.ready = payload[0] is None
+            if payload[0]:
+                print(f'wasteseg worker {worker.process.name} failed to load the model: {payload[0]}',
+                      file=sys.stderr)
+            return
+
+        done, waits, model_seconds = payload
+        for wait_seconds in waits:
+            STAGE_SECONDS.observe(wait_seconds, 'queue_wait')
+        STAGE_SECONDS.observe(model_seconds, 'model')
+        BATCH_SIZE.observe(len(done))
+        for slot, prediction, error in done:
+            with self._lock:
+                worker.slots.discard(slot)
+                future = self._futures.pop(slot)
+            self._free.put(slot)
+            if error:
+                future.set_exception(RuntimeError(error))
+            else:
+                future.set_result((list(prediction), int(np.argmax(prediction))))
+
+    def _replace(self, worker):
+        """Fail the requests a dead worker held, free their slots and start a replacement"""
+        worker.process.join()
+        with self._lock:
+            self._workers.remove(worker)
+            lost = [(slot, self._futures.pop(slot)) for slot in worker.slots]
+            replace = worker.ready and not self._closed
+            if not self._closed:
+                print(f'wasteseg worker {worker.process.name} exited with code {worker.process.exitcode}, '
+                      f'failing {len(lost)} requests' + ('' if replace else ' and not replacing it'),
+                      file=sys.stderr)
+            if replace:
+                self._workers.append(self._spawn())
+            elif not self._workers and not self._closed:
+                self._error = f'All workers have exited (last exit code {worker.process.exitcode})'
+        worker.tasks.close()
+        worker.results.close()
+
+        error = RuntimeError(f'Worker {worker.process.name} exited with code {worker.process.exitcode}')
+        for slot, future in lost:
+            self._free.put(slot)
+            future.set_exception(error)
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            workers = list(self._workers)
+        for worker in workers:
+            worker.tasks.put(None)
+        for worker in workers:
+            worker.process.join(timeout=5)
+        del self._frames
+        self._shm.close()
+        self._shm.unlink()
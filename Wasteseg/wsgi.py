@@ -0,0 +1,4 @@
+"""WSGI entry point: gunicorn -c Wasteseg/gunicorn.conf.py (run from the repository root)"""
+from app import create_app
+
+app = create_app()
@@ -0,0 +1,328 @@
+"""Load-test the Wasteseg /predict or AtharvProj /api/identify API and record a baseline.
+
+Usage (from the repository root):
+
+    python bench/run.py wasteseg --concurrency 16 --duration 20 --mix small:0.7,large:0.3 -o bench/wasteseg.json
+    python bench/run.py atharv --concurrency 8 --images-per-request 3 --gemini-latency 0.8 --gemini-error-rate 0.05
+    python bench/run.py wasteseg --gunicorn --workers 2 --compare bench/wasteseg.json
+
+The app is started in a subprocess by serve.py, against a dummy model
+(Wasteseg) or the Gemini stand-in AtharvProj/mock_gemini.py (AtharvProj).
+It is then driven by `--concurrency` client threads for `--duration`
+seconds. The report covers requests per second, latency percentiles, the
+status-code breakdown, and the server's peak resident memory, summed over
+its process tree. Results are written as JSON. `--compare` checks them
+against an earlier file and exits non-zero when throughput drops, or p95
+latency grows, by more than `--tolerance`.
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import socket
+import subprocess
+import sys
+import threading
+import time
+
+import numpy as np
+import requests
+from PIL import Image
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Synthetic photo sizes: webcam frame, phone photo downscaled by the browser, full-size phone photo
+IMAGE_SIZES = {'small': (640, 480), 'medium': (1536, 1152), 'large': (4032, 3024)}
+
+
+def parse_mix(spec):
+    mix = {}
+    for part in spec.split(','):
+        name, _, weight = part.partition(':')
+        if name not in IMAGE_SIZES:
+            raise argparse.ArgumentTypeError(f"Unknown image size '{name}', expected one of: {', '.join(IMAGE_SIZES)}")
+        mix[name] = float(weight or 1)
+    return mix
+
+
+def make_jpeg(size, seed):
+    """A photo-like JPEG: smooth gradients plus mild noise, so it compresses like a real picture"""
+    rng = np.random.default_rng(seed)
+    width, height = size
+    y, x = np.mgrid[0:height, 0:width].astype(np.float32)
+    phase = rng.uniform(0, 2 * np.pi, 3)
+    img = np.stack([127 + 100 * np.sin(x / rng.uniform(40, 400) + y / rng.uniform(40, 400) + p) for p in phase], -1)
+    img += rng.normal(0, 6, img.shape)
+    buf = io.BytesIO()
+    Image.fromarray(np.clip(img, 0, 255).astype(np.uint8)).save(buf, 'JPEG', quality=90)
+    return buf.getvalue()
+
+
+def make_images(mix, variants):
+    return {name: [make_jpeg(IMAGE_SIZES[name], seed) for seed in range(variants)] for name in mix}
+
+
+def free_port():
+    with socket.socket() as s:
+        s.bind(('127.0.0.1', 0))
+        return s.getsockname()[1]
+
+
+def wait_for_port(port, process, timeout=60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError(f'{process.args[2]} exited with code {process.returncode}')
+        try:
+            socket.create_connection(('127.0.0.1', port), timeout=0.5).close()
+            return
+        except OSError:
+            time.sleep(0.2)
+    raise RuntimeError(f'Nothing listening on port {port} after {timeout}s')
+
+
+def tree_rss(pid):
+    """Resident memory in bytes of `pid` and all its descendants (Linux /proc; None elsewhere)"""
+    total = 0
+    stack = [pid]
+    try:
+        while stack:
+            current = stack.pop()
+            with open(f'/proc/{current}/status') as f:
+                for line in f:
+                    if line.startswith('VmRSS:'):
+                        total += int(line.split()[1]) * 1024
+            for task in os.listdir(f'/proc/{current}/task'):
+                with open(f'/proc/{current}/task/{task}/children') as f:
+                    stack.extend(int(child) for child in f.read().split())
+    except (FileNotFoundError, ProcessLookupError):
+        pass
+    except OSError:
+        return None
+    return total
+
+
+class Driver:
+    """Closed-loop load: each client thread sends its next request as soon as the previous one returns"""
+
+    def __init__(self, url, build_request, concurrency, duration, warmup):
+        self.url = url
+        self.build_request = build_request
+        self.concurrency = concurrency
+        self.duration = duration
+        self.warmup = warmup
+        self.latencies = []
+        self.statuses = {}
+        self.lock = threading.Lock()
+
+    def client(self, index, start, stop):
+        session = requests.Session()
+        rng = random.Random(index)
+        while True:
+            kwargs = self.build_request(rng, index)
+            sent = time.perf_counter()
+            if sent >= stop:
+                break
+            try:
+                response = session.post(self.url, timeout=120, **kwargs)
+                status = str(response.status_code)
+                # Count results in the body too: AtharvProj reports per-image failures inside a 200
+                if response.ok and 'json' in response.headers.get('Content-Type', ''):
+                    body = response.json()
+                    if any('error' in r for r in body.get('results', [])):
+                        status = '200-with-errors'
+            except requests.RequestException as e:
+                status = type(e).__name__
+            done = time.perf_counter()
+            if sent < start:
+                continue
+            with self.lock:
+                self.latencies.append(done - sent)
+                self.statuses[status] = self.statuses.get(status, 0) + 1
+
+    def run(self, server_pid):
+        now = time.perf_counter()
+        start = now + self.warmup
+        stop = start + self.duration
+        threads = [threading.Thread(target=self.client, args=(i, start, stop), daemon=True)
+                   for i in range(self.concurrency)]
+        for thread in threads:
+            thread.start()
+
+        peak_rss = 0
+        while any(thread.is_alive() for thread in threads):
+            rss = tree_rss(server_pid)
+            peak_rss = max(peak_rss, rss or 0)
+            time.sleep(0.25)
+
+        latencies = np.array(self.latencies)
+        ok = sum(count for status, count in self.statuses.items() if status == '200')
+        return {
+            'requests': len(latencies),
+            'ok': ok,
+            'rps': len(latencies) / self.duration,
+            'ok_rps': ok / self.duration,
+            'latency_ms': {
+                'mean': float(latencies.mean() * 1000) if len(latencies) else None,
+                **{f'p{q}': float(np.percentile(latencies, q) * 1000) if len(latencies) else None
+                   for q in (50, 95, 99)},
+                'max': float(latencies.max() * 1000) if len(latencies) else None,
+            },
+            'statuses': dict(sorted(self.statuses.items())),
+            'server_peak_rss_mb': peak_rss / 2**20 if peak_rss else None,
+        }
+
+
+def wasteseg_request(images, weights):
+    names = list(images)
+
+    def build(rng, index):
+        name = rng.choices(names, weights)[0]
+        # Distinct client ids keep the frame gate from merging different clients' streams
+        return {'data': rng.choice(images[name]),
+                'headers': {'Content-Type': 'image/jpeg', 'X-Client-Id': f'bench-{index}'}}
+    return build
+
+
+def atharv_request(images, weights, per_request):
+    names = list(images)
+
+    def build(rng, index):
+        files = []
+        for i in range(per_request):
+            name = rng.choices(names, weights)[0]
+            files.append(('images', (f'{name}_{i}.jpg', rng.choice(images[name]), 'image/jpeg')))
+        return {'files': files}
+    return build
+
+
+def compare(result, baseline, tolerance):
+    """Print deltas against `baseline`; return False on a throughput or p95 regression beyond `tolerance`"""
+    old, new = baseline['results'], result['results']
+    ok = True
+    for label, old_value, new_value, higher_is_better in (
+        ('ok rps', old['ok_rps'], new['ok_rps'], True),
+        ('p50 ms', old['latency_ms']['p50'], new['latency_ms']['p50'], False),
+        ('p95 ms', old['latency_ms']['p95'], new['latency_ms']['p95'], False),
+        ('p99 ms', old['latency_ms']['p99'], new['latency_ms']['p99'], False),
+        ('peak rss MB', old['server_peak_rss_mb'], new['server_peak_rss_mb'], False),
+    ):
+        if not old_value or new_value is None:
+            continue
+        change = (new_value - old_value) / old_value
+        regressed = (change < -tolerance) if higher_is_better else (change > tolerance)
+        if regressed and label in ('ok rps', 'p95 ms'):
+            ok = False
+        flag = '  REGRESSION' if regressed else ''
+        print(f'{label:>12}: {old_value:10.1f} -> {new_value:10.1f} ({change:+.1%}){flag}')
+    if baseline['config'] != result['config']:
+        print('note: baseline was recorded with a different configuration')
+    return ok
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('app', choices=['wasteseg', 'atharv'])
+    parser.add_argument('--concurrency', type=int, default=8)
+    parser.add_argument('--duration', type=float, default=15, help='measured seconds')
+    parser.add_argument('--warmup', type=float, default=3, help='seconds of load before measuring')
+    parser.add_argument('--mix', type=parse_mix, default=parse_mix('small:1'),
+                        help='image sizes and weights, e.g. small:0.7,large:0.3')
+    parser.add_argument('--variants', type=int, default=8, help='distinct images per size')
+    parser.add_argument('--images-per-request', type=int, default=1, help='atharv: images per upload')
+    parser.add_argument('--gunicorn', action='store_true')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--model-ms', type=float, default=4.0)
+    parser.add_argument('--model-ms-per-image', type=float, default=1.0)
+    parser.add_argument('--gemini-latency', type=float, default=0.5)
+    parser.add_argument('--gemini-error-rate', type=float, default=0.0)
+    parser.add_argument('--env', action='append', default=[], metavar='NAME=VALUE',
+                        help='extra environment for the server, e.g. WASTESEG_MAX_BATCH_SIZE=16')
+    parser.add_argument('-o', '--output', help='write results JSON here')
+    parser.add_argument('--compare', help='baseline JSON to check against')
+    parser.add_argument('--tolerance', type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    config = {k: v for k, v in vars(args).items() if k not in ('output', 'compare', 'tolerance')}
+    env = dict(os.environ, PYTHONUNBUFFERED='1')
+    env.update(item.split('=', 1) for item in args.env)
+
+    print('generating images...')
+    images = make_images(args.mix, args.variants)
+    weights = [args.mix[name] for name in images]
+
+    processes = []
+    try:
+        if args.app == 'atharv':
+            gemini_port = free_port()
+            # No caching: repeated benchmark images would otherwise be served from memory
+            env.setdefault('GEMINI_CACHE_SIZE', '0')
+            processes.append(subprocess.Popen(
+                [sys.executable, os.path.join(ROOT, 'AtharvProj', 'mock_gemini.py'), '--port', str(gemini_port),
+                 '--latency', str(args.gemini_latency), '--error-rate', str(args.gemini_error_rate)],
+                env=env, stdout=subprocess.DEVNULL,
+            ))
+            wait_for_port(gemini_port, processes[-1])
+
+        port = free_port()
+        command = [sys.executable, os.path.join(ROOT, 'bench', 'serve.py'), args.app, '--port', str(port),
+                   '--workers', str(args.workers), '--threads', str(args.threads),
+                   '--worker-class', args.worker_class,
+                   '--model-ms', str(args.model_ms), '--model-ms-per-image', str(args.model_ms_per_image)]
+        if args.app == 'atharv':
+            command += ['--gemini-url', f'http://127.0.0.1:{gemini_port}/v1beta/models/mock:generateContent']
+        if args.gunicorn:
+            command.append('--gunicorn')
+        server = subprocess.Popen(command, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+        processes.append(server)
+        wait_for_port(port, server)
+
+        if args.app == 'wasteseg':
+            url = f'http://127.0.0.1:{port}/predict'
+            build = wasteseg_request(images, weights)
+        else:
+            url = f'http://127.0.0.1:{port}/api/identify'
+            build = atharv_request(images, weights, args.images_per_request)
+
+        print(f'driving {url} with {args.concurrency} clients for {args.duration:g}s (+{args.warmup:g}s warmup)...')
+        results = Driver(url, build, args.concurrency, args.duration, args.warmup).run(server.pid)
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+    record = {
+        'app': args.app,
+        'recorded': time.strftime('%Y-%m-%dT%H:%M:%S'),
+        'host': {'python': platform.python_version(), 'machine': platform.machine(), 'cpus': os.cpu_count()},
+        'config': config,
+        'results': results,
+    }
+    latency = results['latency_ms']
+    print(f"{results['requests']} requests, {results['rps']:.1f} rps ({results['ok_rps']:.1f} ok), "
+          f"p50 {latency['p50']:.1f} ms, p95 {latency['p95']:.1f} ms, p99 {latency['p99']:.1f} ms, "
+          f"peak rss {results['server_peak_rss_mb'] or 0:.0f} MB")
+    print(f"statuses: {results['statuses']}")
+
+    if args.output:
+        with open(args.output, 'w') as f:
+            json.dump(record, f, indent=2)
+            f.write('\n')
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        if not compare(record, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
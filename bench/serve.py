@@ -0,0 +1,114 @@
+"""Serve Wasteseg or AtharvProj against local stand-ins, for load tests.
+
+Usage (from the repository root; run.py starts this for you):
+
+    python bench/serve.py wasteseg --port 5001 --model-ms 4 --model-ms-per-image 1
+    python bench/serve.py atharv --port 5002 --gemini-url http://127.0.0.1:8081/v1beta/models/mock:generateContent
+
+For Wasteseg, a dummy backend replaces the real model. It sleeps a fixed
+time per batch plus a time per image, so batching behaves as it does with
+a real model, and it needs no TensorFlow or model files. AtharvProj is
+pointed at a Gemini stand-in (AtharvProj/mock_gemini.py). Both apps are
+served either by werkzeug's threaded server or, with --gunicorn, through
+gunicorn with the given worker/thread counts. Under gunicorn, create_app()
+runs inside each worker, as it does with wsgi.py.
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class DummyBackend:
+    """Stand-in for a Wasteseg model: constant-cost batches and a fixed class"""
+
+    name = 'dummy'
+    input_size = (224, 224)
+
+    def __init__(self, batch_seconds, image_seconds, classes=14):
+        self.batch_seconds = batch_seconds
+        self.image_seconds = image_seconds
+        self.classes = classes
+
+    def predict(self, batch):
+        time.sleep(self.batch_seconds + self.image_seconds * len(batch))
+        out = np.zeros((len(batch), self.classes), np.float32)
+        # Derive the class from the pixels so results differ between images
+        out[np.arange(len(batch)), (batch.reshape(len(batch), -1)[:, ::997].sum(axis=1) * 10).astype(int) % self.classes] = 1
+        return out
+
+
+def wasteseg_factory(args):
+    sys.path.insert(0, os.path.join(ROOT, 'Wasteseg'))
+    import backends
+
+    def load_dummy(name, model_dir, threads=None, model_bytes=None):
+        return DummyBackend(args.model_ms / 1000, args.model_ms_per_image / 1000)
+
+    backends.load_backend = load_dummy
+    import app
+    import workers
+    app.load_backend = workers.load_backend = load_dummy
+    app.preload_model = lambda name, model_dir: None
+    return app.create_app
+
+
+def atharv_factory(args):
+    os.environ['GEMINI_API_URL'] = args.gemini_url
+    os.environ.setdefault('GEMINI_API_KEY', 'bench')
+    os.environ.setdefault('JOBS_DB', os.path.join('/tmp', f'bench_jobs_{os.getpid()}.sqlite3'))
+    sys.path.insert(0, os.path.join(ROOT, 'AtharvProj'))
+    import app
+    return app.create_app
+
+
+def serve_gunicorn(factory, args):
+    from gunicorn.app.base import BaseApplication
+
+    class BenchApplication(BaseApplication):
+        def load_config(self):
+            for key, value in {
+                'bind': f'127.0.0.1:{args.port}',
+                'workers': args.workers,
+                'threads': args.threads,
+                'worker_class': args.worker_class,
+                'timeout': 120,
+                'accesslog': None,
+                'loglevel': 'warning',
+            }.items():
+                self.cfg.set(key, value)
+
+        def load(self):
+            return factory()
+
+    BenchApplication().run()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('app', choices=['wasteseg', 'atharv'])
+    parser.add_argument('--port', type=int, default=5001)
+    parser.add_argument('--gunicorn', action='store_true', help='serve through gunicorn instead of werkzeug')
+    parser.add_argument('--workers', type=int, default=2)
+    parser.add_argument('--threads', type=int, default=8)
+    parser.add_argument('--worker-class', default='gthread')
+    parser.add_argument('--model-ms', type=float, default=4.0, help='dummy model cost per batch')
+    parser.add_argument('--model-ms-per-image', type=float, default=1.0, help='dummy model cost per image')
+    parser.add_argument('--gemini-url', default='http://127.0.0.1:8081/v1beta/models/mock:generateContent')
+    args = parser.parse_args(argv)
+
+    os.chdir(ROOT)
+    factory = wasteseg_factory(args) if args.app == 'wasteseg' else atharv_factory(args)
+    if args.gunicorn:
+        serve_gunicorn(factory, args)
+    else:
+        from werkzeug.serving import run_simple
+        run_simple('127.0.0.1', args.port, factory(), threaded=True)
+
+
+if __name__ == '__main__':
+    main()